@@ -0,0 +1,3 @@
+# bash
+#!/usr/bin/env bash
+python3 src/benchmark.py "$@"
@@ -0,0 +1,16 @@
+# bash
+#!/usr/bin/env bash
+# Builds the site as N shards in parallel local processes, then merges them:
+#   ./shard.sh 4 --search --feeds
+count="${1:-2}"
+shift
+rm -rf docs.shards
+pids=()
+for ((i = 0; i < count; i++)); do
+    python3 src/main.py "/StaticWebsiteGenerator/" --shard "$i/$count" "$@" &
+    pids+=($!)
+done
+for pid in "${pids[@]}"; do
+    wait "$pid" || exit 1
+done
+python3 src/main.py merge "/StaticWebsiteGenerator/" "$@"
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from copystatic import copy_files_recursive
+from inline_markdown import text_to_textnodes
+from markdown_blocks import (
+    BlockType,
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+)
+from template import load_template
+
+STAGES = [
+    "markdown_to_blocks",
+    "block_to_block_type",
+    "text_to_textnodes",
+    "to_html",
+    "template_fill",
+    "disk_write",
+    "copy_files_recursive",
+]
+WORDS = "the hobbit ring elf dwarf wizard river mountain shire road tower sword song tree".split()
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def generate_corpus(root, pages=100, blocks=20, link_density=0.1, image_density=0.02,
+                    emphasis_density=0.1, static_files=10, static_size=64 * 1024, seed=0):
+    # Densities are the chance that any given word is wrapped in that markup.
+    rng = random.Random(seed)
+    content_dir = os.path.join(root, "content")
+    static_dir = os.path.join(root, "static")
+    os.makedirs(content_dir, exist_ok=True)
+    os.makedirs(os.path.join(static_dir, "images"), exist_ok=True)
+
+    for i in range(static_files):
+        with open(os.path.join(static_dir, "images", f"image{i}.png"), "wb") as f:
+            f.write(rng.randbytes(static_size))
+    with open(os.path.join(static_dir, "index.css"), "w") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+
+    for i in range(pages):
+        page_dir = os.path.join(content_dir, "blog", f"post{i}")
+        os.makedirs(page_dir, exist_ok=True)
+        parts = [f"# Post {i}"]
+        for j in range(blocks):
+            parts.append(_random_block(rng, j, pages, static_files, link_density, image_density, emphasis_density))
+        with open(os.path.join(page_dir, "index.md"), "w") as f:
+            f.write("\n\n".join(parts) + "\n")
+    return content_dir, static_dir, os.path.join(root, "template.html")
+
+
+def _random_block(rng, index, pages, static_files, link_density, image_density, emphasis_density):
+    kind = index % 6
+    if kind == 1:
+        return "\n".join(f"- {_random_text(rng, 8, pages, static_files, link_density, image_density, emphasis_density)}" for _ in range(4))
+    if kind == 2:
+        return "\n".join(f"{n}. {_random_text(rng, 8, pages, static_files, link_density, image_density, emphasis_density)}" for n in range(1, 5))
+    if kind == 3:
+        return "> " + _random_text(rng, 20, pages, static_files, link_density, image_density, emphasis_density)
+    if kind == 4:
+        return "```\n" + "\n".join(" ".join(rng.choices(WORDS, k=6)) for _ in range(5)) + "\n```"
+    if kind == 5:
+        return "## " + " ".join(rng.choices(WORDS, k=4))
+    return _random_text(rng, 60, pages, static_files, link_density, image_density, emphasis_density)
+
+
+def _random_text(rng, words, pages, static_files, link_density, image_density, emphasis_density):
+    out = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < link_density:
+            word = f"[{word}](/blog/post{rng.randrange(pages)})"
+        elif roll < link_density + image_density and static_files > 0:
+            word = f"![{word}](/images/image{rng.randrange(static_files)}.png)"
+        elif roll < link_density + image_density + emphasis_density:
+            word = rng.choice(["**{}**", "_{}_", "`{}`"]).format(word)
+        out.append(word)
+    return " ".join(out)
+
+
+def run_stages(content_dir, static_dir, template_path, out_dir):
+    timings = {}
+    sources = []
+    for root, _, filenames in os.walk(content_dir):
+        for filename in sorted(filenames):
+            path = os.path.join(root, filename)
+            with open(path) as f:
+                sources.append((os.path.relpath(path, content_dir), f.read()))
+
+    start = time.perf_counter()
+    documents = [markdown_to_blocks(markdown) for _, markdown in sources]
+    timings["markdown_to_blocks"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    typed = [[(block, block_to_block_type(block)) for block in blocks] for blocks in documents]
+    timings["block_to_block_type"] = time.perf_counter() - start
+
+    inline_texts = []
+    for blocks in typed:
+        for block, block_type in blocks:
+            if block_type == BlockType.PARAGRAPH:
+                inline_texts.append(block.replace("\n", " "))
+            elif block_type in (BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST):
+                inline_texts.extend(line.split(" ", 1)[1] for line in block.split("\n"))
+    start = time.perf_counter()
+    for text in inline_texts:
+        text_to_textnodes(text)
+    timings["text_to_textnodes"] = time.perf_counter() - start
+
+    nodes = [markdown_to_html_node(markdown) for _, markdown in sources]
+    start = time.perf_counter()
+    bodies = [node.to_html() for node in nodes]
+    timings["to_html"] = time.perf_counter() - start
+
+    template = load_template(template_path, "/site/")
+    start = time.perf_counter()
+    pages = [template.render(Title=rel_path, Content=body) for (rel_path, _), body in zip(sources, bodies)]
+    timings["template_fill"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for (rel_path, _), page in zip(sources, pages):
+        dest_path = os.path.join(out_dir, rel_path[:-len(".md")] + ".html")
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        with open(dest_path, "w") as f:
+            f.write(page)
+    timings["disk_write"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    copy_files_recursive(static_dir, os.path.join(out_dir, "static"))
+    timings["copy_files_recursive"] = time.perf_counter() - start
+    return timings
+
+
+def run_benchmark(root, repeat=5, **corpus_options):
+    content_dir, static_dir, template_path = generate_corpus(root, **corpus_options)
+    samples = {stage: [] for stage in STAGES}
+    for i in range(repeat):
+        out_dir = os.path.join(root, f"out{i}")
+        for stage, seconds in run_stages(content_dir, static_dir, template_path, out_dir).items():
+            samples[stage].append(seconds)
+        shutil.rmtree(out_dir)
+    return {
+        "config": dict(corpus_options, repeat=repeat),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stages": {
+            stage: {
+                "min_s": min(times),
+                "median_s": statistics.median(times),
+                "runs": times,
+            }
+            for stage, times in samples.items()
+        },
+    }
+
+
+def compare_results(baseline, current):
+    lines = []
+    for stage in STAGES:
+        old = baseline["stages"].get(stage)
+        new = current["stages"].get(stage)
+        if old is None or new is None or old["min_s"] == 0:
+            continue
+        ratio = new["min_s"] / old["min_s"]
+        lines.append(f"{stage:22} {old['min_s'] * 1000:10.2f} ms -> {new['min_s'] * 1000:10.2f} ms  x{ratio:.2f}")
+    return "\n".join(lines)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Time each build stage on a synthetic site")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--blocks", type=int, default=30, help="blocks per page")
+    parser.add_argument("--link-density", type=float, default=0.1)
+    parser.add_argument("--image-density", type=float, default=0.02)
+    parser.add_argument("--emphasis-density", type=float, default=0.1)
+    parser.add_argument("--static-files", type=int, default=20)
+    parser.add_argument("--static-size", type=int, default=256 * 1024, help="bytes per static file")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as root:
+        results = run_benchmark(
+            root,
+            repeat=args.repeat,
+            pages=args.pages,
+            blocks=args.blocks,
+            link_density=args.link_density,
+            image_density=args.image_density,
+            emphasis_density=args.emphasis_density,
+            static_files=args.static_files,
+            static_size=args.static_size,
+            seed=args.seed,
+        )
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for stage in STAGES:
+        print(f"{stage:22} {results['stages'][stage]['min_s'] * 1000:10.2f} ms")
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare_results(json.load(f), results))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# Rendered HTML depends on these modules, so their source is part of every key
+# and editing the renderer invalidates the whole cache.
+RENDERER_MODULES = ["markdown_blocks.py", "inline_markdown.py", "textnode.py", "htmlnode.py"]
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def renderer_version():
+    digest = hashlib.sha256()
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDERER_MODULES:
+        with open(os.path.join(src_dir, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class BlockCache():
+    # Maps the hash of a block's type and source lines to its rendered HTML,
+    # evicting least recently used entries once max_bytes is exceeded.
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        self.max_bytes = max_bytes
+        self.version = version if version is not None else renderer_version()
+        self.entries = OrderedDict()
+        self.size = 0
+        # Pool workers set record_added to hand their new entries back (see
+        # take_added); elsewhere entries only go into the LRU.
+        self.record_added = False
+        self.added = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, block_type, lines):
+        digest = hashlib.sha256(f"{self.version}\0{block_type.value}\0".encode())
+        digest.update("\n".join(lines).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return html
+
+    def put(self, key, html):
+        self._insert(key, html)
+        if self.record_added:
+            self.added[key] = html
+
+    def _insert(self, key, html):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= len(key) + len(old)
+        self.entries[key] = html
+        self.size += len(key) + len(html)
+        while self.size > self.max_bytes and self.entries:
+            old_key, old_html = self.entries.popitem(last=False)
+            self.size -= len(old_key) + len(old_html)
+
+    def take_added(self):
+        added = self.added
+        self.added = {}
+        return added
+
+    def merge(self, entries):
+        for key, html in entries.items():
+            self.put(key, html)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, path):
+        dir_path = os.path.dirname(path)
+        if dir_path != "":
+            os.makedirs(dir_path, exist_ok=True)
+        # Shards built side by side save the same cache; the last one wins.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.version, "entries": list(self.entries.items())}, f)
+        os.replace(tmp_path, path)
+
+
+def load_block_cache(path, max_bytes=DEFAULT_MAX_BYTES):
+    cache = BlockCache(max_bytes)
+    if not os.path.exists(path):
+        return cache
+    with open(path, "r") as f:
+        try:
+            data = json.load(f)
+        except ValueError:
+            return cache
+    if data.get("version") != cache.version:
+        return cache
+    for key, html in data.get("entries", []):
+        cache._insert(key, html)
+    return cache
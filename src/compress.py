@@ -0,0 +1,95 @@
+import gzip
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from copystatic import copy_file, scan_files
+from manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".xml", ".json", ".txt", ".svg")
+DEFAULT_LEVEL = 9
+DEFAULT_MIN_SIZE = 1024
+
+
+def is_compressible(rel_path, size, min_size=DEFAULT_MIN_SIZE):
+    return rel_path.lower().endswith(COMPRESSIBLE_EXTENSIONS) and size >= min_size
+
+
+def compress_file(path, level=DEFAULT_LEVEL):
+    # mtime=0 and no file name in the header keep the output byte-for-byte
+    # reproducible, so unchanged pages give unchanged .gz files.
+    with open(path, "rb") as f:
+        data = gzip.compress(f.read(), compresslevel=level, mtime=0)
+    tmp_path = path + ".gz.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path + ".gz")
+
+
+def compress_outputs(dir_path, level=DEFAULT_LEVEL, min_size=DEFAULT_MIN_SIZE, previous_dir_path=None, jobs=None, state=None):
+    # Writes a .gz sibling for every compressible file in dir_path unless its
+    # .gz was made from the same bytes at the same level, and removes .gz
+    # files whose source is gone or no longer qualifies. state maps relative
+    # paths to the hash and level of the source each .gz was compressed from;
+    # it describes previous_dir_path when given (the live tree a staged build
+    # will replace), else dir_path, and is updated to describe dir_path.
+    # Hashes decide rather than mtimes: --link-static shares mtimes with
+    # static/, and restored files can carry older ones. The .gz files of
+    # sources unchanged since previous_dir_path are linked from there.
+    # Returns (compressed, removed).
+    if state is None:
+        state = {}
+    previous = dict(state)
+    state.clear()
+    files = dict(scan_files(dir_path))
+    compressed = []
+    removed = []
+    for rel_path, stat in files.items():
+        if rel_path.endswith(".gz"):
+            source = files.get(rel_path[:-len(".gz")])
+            if source is None or not is_compressible(rel_path[:-len(".gz")], source.st_size, min_size):
+                logger.info(" * removing %s", os.path.join(dir_path, rel_path))
+                os.remove(os.path.join(dir_path, rel_path))
+                removed.append(rel_path)
+            continue
+        if not is_compressible(rel_path, stat.st_size, min_size):
+            continue
+        entry = {"hash": hash_file(os.path.join(dir_path, rel_path)), "level": level}
+        state[rel_path] = entry
+        if previous.get(rel_path) == entry:
+            if previous_dir_path is None and rel_path + ".gz" in files:
+                continue
+            if previous_dir_path is not None and _reuse_previous(rel_path, dir_path, previous_dir_path):
+                continue
+        compressed.append(rel_path)
+
+    paths = [os.path.join(dir_path, rel_path) for rel_path in compressed]
+    for path in paths:
+        logger.info(" * compressing %s", path)
+    # zlib releases the GIL, so threads compress in parallel.
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(lambda path: compress_file(path, level), paths))
+    return compressed, removed
+
+
+def remove_compressed(dir_path, state):
+    # Removes the .gz files state lists from dir_path, for when --gzip is
+    # dropped. Returns the removed relative paths.
+    removed = []
+    for rel_path in sorted(state):
+        path = os.path.join(dir_path, rel_path + ".gz")
+        if os.path.isfile(path):
+            logger.info(" * removing %s", path)
+            os.remove(path)
+            removed.append(rel_path + ".gz")
+    return removed
+
+
+def _reuse_previous(rel_path, dir_path, previous_dir_path):
+    previous_gz_path = os.path.join(previous_dir_path, rel_path + ".gz")
+    if not os.path.isfile(previous_gz_path):
+        return False
+    copy_file(previous_gz_path, os.path.join(dir_path, rel_path + ".gz"), link=True)
+    return True
@@ -1,15 +1,209 @@
+import json
+import logging
 import os
+import posixpath
 import shutil
 
+from manifest import hash_file
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".woff", ".woff2")
+FINGERPRINT_LENGTH = 8
+
 def copy_files_recursive(source_dir_path, dest_dir_path):
-    if not os.path.exists(dest_dir_path):
-        os.mkdir(dest_dir_path)
+    # Other build stages may create the same directories concurrently.
+    os.makedirs(dest_dir_path, exist_ok=True)
+
+    with os.scandir(source_dir_path) as entries:
+        for entry in entries:
+            from_path = entry.path
+            dest_path = os.path.join(dest_dir_path, entry.name)
+            logger.info(" * %s -> %s", from_path, dest_path)
+            if entry.is_file():
+                shutil.copy(from_path, dest_path)
+            else:
+                copy_files_recursive(from_path, dest_path)
+
+def sync_static(source_dir_path, dest_dir_path, previous, use_hash=False, link=False):
+    # previous maps relative paths to the size/mtime (and hash) recorded when
+    # they were last copied. Only files whose record changed are copied, and
+    # files recorded before but gone from the source are removed.
+    state = {}
+    changed = []
+    for rel_path, stat in scan_files(source_dir_path):
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        old_entry = previous.get(rel_path)
+        if use_hash:
+            if old_entry is not None and old_entry.get("mtime_ns") == entry["mtime_ns"] and "hash" in old_entry:
+                entry["hash"] = old_entry["hash"]
+            else:
+                entry["hash"] = hash_file(from_path)
+        state[rel_path] = entry
 
-    for filename in os.listdir(source_dir_path):
-        from_path = os.path.join(source_dir_path, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        print(f" * {from_path} -> {dest_path}")
+        if old_entry is not None and os.path.exists(dest_path):
+            if old_entry.get("size") == entry["size"] and old_entry.get("mtime_ns") == entry["mtime_ns"]:
+                continue
+            if use_hash and old_entry.get("hash") == entry["hash"]:
+                continue
+        logger.info(" * %s -> %s", from_path, dest_path)
+        copy_file(from_path, dest_path, link)
+        changed.append(rel_path)
+
+    removed = []
+    for rel_path in previous:
+        if rel_path not in state:
+            dest_path = os.path.join(dest_dir_path, rel_path)
+            logger.info(" * removing %s", dest_path)
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+            prune_empty_dirs(dest_path, dest_dir_path)
+            removed.append(rel_path)
+    return state, changed, removed
+
+def sync_static_paths(rel_paths, source_dir_path, dest_dir_path, state, link=False):
+    # Syncs only the given files, e.g. the ones a file watcher reported.
+    changed = []
+    removed = []
+    for rel_path in rel_paths:
+        from_path = os.path.join(source_dir_path, rel_path)
+        dest_path = os.path.join(dest_dir_path, rel_path)
         if os.path.isfile(from_path):
-            shutil.copy(from_path, dest_path)
-        else:
-            copy_files_recursive(from_path, dest_path)
\ No newline at end of file
+            stat = os.stat(from_path)
+            logger.info(" * %s -> %s", from_path, dest_path)
+            copy_file(from_path, dest_path, link)
+            state[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            changed.append(rel_path)
+        elif rel_path in state:
+            logger.info(" * removing %s", dest_path)
+            if os.path.isfile(dest_path):
+                os.remove(dest_path)
+            prune_empty_dirs(dest_path, dest_dir_path)
+            del state[rel_path]
+            removed.append(rel_path)
+    return changed, removed
+
+def scan_files(dir_path, prefix=""):
+    files = []
+    with os.scandir(dir_path) as entries:
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if entry.is_dir():
+                files.extend(scan_files(entry.path, rel_path + "/"))
+            else:
+                files.append((rel_path, entry.stat()))
+    files.sort()
+    return files
+
+def copy_file(from_path, dest_path, link=False):
+    if os.path.isdir(dest_path) and not os.path.islink(dest_path):
+        shutil.rmtree(dest_path)
+    elif os.path.lexists(dest_path):
+        os.remove(dest_path)
+    else:
+        os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    if link:
+        try:
+            os.link(from_path, dest_path)
+            return
+        except OSError:
+            pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            _copy_file_range(from_path, dest_path)
+            shutil.copymode(from_path, dest_path)
+            return
+        except OSError:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+    shutil.copy(from_path, dest_path)
+
+def _copy_file_range(from_path, dest_path):
+    # Lets the kernel copy (or reflink) the data without a userspace buffer.
+    with open(from_path, "rb") as src, open(dest_path, "wb") as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+def prune_empty_dirs(path, root):
+    root = os.path.abspath(root)
+    dir_path = os.path.dirname(os.path.abspath(path))
+    while dir_path != root and dir_path.startswith(root) and os.path.isdir(dir_path) and not os.listdir(dir_path):
+        os.rmdir(dir_path)
+        dir_path = os.path.dirname(dir_path)
+
+def hash_assets(source_dir_path, previous):
+    # Content hashes of the static files that get fingerprinted. A file whose
+    # size and mtime match its previous record keeps its hash unread.
+    state = {}
+    for rel_path, stat in scan_files(source_dir_path):
+        if not rel_path.lower().endswith(FINGERPRINT_EXTENSIONS):
+            continue
+        old_entry = previous.get(rel_path)
+        if old_entry is not None and old_entry.get("size") == stat.st_size and old_entry.get("mtime_ns") == stat.st_mtime_ns:
+            state[rel_path] = old_entry
+            continue
+        state[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "hash": hash_file(os.path.join(source_dir_path, rel_path)),
+        }
+    return state
+
+def fingerprinted_path(rel_path, file_hash):
+    root, ext = posixpath.splitext(rel_path)
+    return f"{root}.{file_hash[:FINGERPRINT_LENGTH]}{ext}"
+
+def asset_map(state):
+    # Root-relative URL of each asset to the URL of its fingerprinted copy.
+    return {"/" + rel_path: "/" + fingerprinted_path(rel_path, entry["hash"]) for rel_path, entry in state.items()}
+
+def write_fingerprinted(state, dest_dir_path, previous=None):
+    # Adds a fingerprinted copy next to each asset already in dest_dir_path
+    # (so it matches what was copied or optimized there) and removes copies
+    # left over from previous hashes.
+    written = []
+    wanted = set()
+    for rel_path, entry in sorted(state.items()):
+        fingerprint = fingerprinted_path(rel_path, entry["hash"])
+        wanted.add(fingerprint)
+        dest_path = os.path.join(dest_dir_path, fingerprint)
+        if os.path.exists(dest_path):
+            continue
+        logger.info(" * %s -> %s", os.path.join(dest_dir_path, rel_path), dest_path)
+        copy_file(os.path.join(dest_dir_path, rel_path), dest_path, link=True)
+        written.append(fingerprint)
+    removed = []
+    for rel_path, entry in sorted((previous or {}).items()):
+        fingerprint = fingerprinted_path(rel_path, entry["hash"])
+        dest_path = os.path.join(dest_dir_path, fingerprint)
+        if fingerprint not in wanted and os.path.isfile(dest_path):
+            logger.info(" * removing %s", dest_path)
+            os.remove(dest_path)
+            prune_empty_dirs(dest_path, dest_dir_path)
+            removed.append(fingerprint)
+    return written, removed
+
+def load_asset_state(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+def save_asset_state(path, state):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1)
+    os.replace(tmp_path, path)
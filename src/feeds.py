@@ -0,0 +1,119 @@
+import json
+import os
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+from siteindex import published_pages
+
+DEFAULT_SITE_URL = "https://imistake.github.io"
+FEED_PREFIX = "blog/"
+FEED_FILE = "feed.xml"
+SITEMAP_FILE = "sitemap.xml"
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def updated(entry):
+    # RFC 3339 timestamp for a site index entry: its front matter date when it
+    # has one, else the source file's mtime.
+    date = str(entry["date"] or "")
+    if DATE_PATTERN.fullmatch(date):
+        return date + "T00:00:00Z"
+    if DATE_PATTERN.match(date) and "T" in date:
+        return date
+    moment = datetime.fromtimestamp(entry["mtime_ns"] / 1e9, timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sitemap_xml(index, base_url):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for entry in sorted(published_pages(index), key=lambda entry: entry["url"]):
+        lines.append(
+            f"  <url><loc>{escape(base_url + entry['url'])}</loc><lastmod>{updated(entry)[:10]}</lastmod></url>"
+        )
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def feed_entry_xml(entry, base_url):
+    url = base_url + entry["url"]
+    lines = [
+        "  <entry>",
+        f"    <title>{escape(entry['title'] or entry['url'])}</title>",
+        f"    <link href={quoteattr(url)}/>",
+        f"    <id>{escape(url)}</id>",
+        f"    <updated>{updated(entry)}</updated>",
+    ]
+    for tag in entry["tags"]:
+        lines.append(f"    <category term={quoteattr(tag)}/>")
+    lines.append("  </entry>")
+    return "\n".join(lines)
+
+
+def feed_xml(index, base_url, cache=None):
+    # Atom feed of the published pages under blog/, newest first. cache maps
+    # a source path to its last entry and the inputs it was made from; an
+    # entry is only rebuilt when those change. Returns (xml, cache, rebuilt).
+    old_cache = cache or {}
+    new_cache = {}
+    rebuilt = []
+    entries = []
+    for entry in published_pages(index, FEED_PREFIX):
+        key = json.dumps([entry["url"], entry["title"], entry["date"], entry["tags"], entry["mtime_ns"], base_url])
+        cached = old_cache.get(entry["source"])
+        if cached is None or cached["key"] != key:
+            cached = {"key": key, "xml": feed_entry_xml(entry, base_url), "updated": updated(entry)}
+            rebuilt.append(entry["source"])
+        new_cache[entry["source"]] = cached
+        entries.append(cached)
+
+    home = [entry for entry in index if entry["url"] == ""]
+    title = home[0]["title"] if home and home[0]["title"] else base_url
+    latest = max((cached["updated"] for cached in entries), default="1970-01-01T00:00:00Z")
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"  <title>{escape(title)}</title>",
+        f"  <link href={quoteattr(base_url + FEED_FILE)} rel=\"self\"/>",
+        f"  <link href={quoteattr(base_url)}/>",
+        f"  <id>{escape(base_url)}</id>",
+        f"  <updated>{latest}</updated>",
+        f"  <author><name>{escape(title)}</name></author>",
+    ]
+    lines.extend(cached["xml"] for cached in entries)
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n", new_cache, rebuilt
+
+
+def write_if_changed(path, text):
+    data = text.encode()
+    if os.path.isfile(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def load_feed_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return {}
+
+
+def save_feed_cache(path, cache):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, indent=1)
+    os.replace(tmp_path, path)
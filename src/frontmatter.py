@@ -0,0 +1,98 @@
+FRONT_MATTER_FENCE = "---"
+FIELDS = ("title", "date", "tags", "draft", "template")
+
+
+def parse_front_matter(lines):
+    # A small YAML subset: "key: value" pairs, inline [a, b] lists, "- item"
+    # lists under an empty key, booleans, quoted strings and # comments.
+    metadata = {}
+    list_key = None
+    for line in lines:
+        s = line.strip()
+        if s == "" or s.startswith("#"):
+            continue
+        if s.startswith("- ") and list_key is not None:
+            metadata[list_key].append(_parse_scalar(s[2:]))
+            continue
+        key, sep, value = s.partition(":")
+        if sep == "":
+            raise ValueError(f"invalid front matter line: {line}")
+        key = key.strip()
+        value = value.strip()
+        if value == "":
+            metadata[key] = []
+            list_key = key
+            continue
+        list_key = None
+        metadata[key] = _parse_value(value)
+    if "tags" in metadata:
+        metadata["tags"] = normalize_tags(metadata["tags"])
+    if "draft" in metadata and not isinstance(metadata["draft"], bool):
+        raise ValueError(f"invalid draft value: {metadata['draft']}")
+    for key in ("title", "template"):
+        # An empty value reads as an empty list; treat it as unset, so the
+        # title falls back to the first heading.
+        if metadata.get(key) == []:
+            del metadata[key]
+        elif key in metadata and (not isinstance(metadata[key], str) or metadata[key].strip() == ""):
+            raise ValueError(f"invalid {key} value: {metadata[key]}")
+    return metadata
+
+
+def _parse_value(value):
+    if value.startswith("[") and value.endswith("]"):
+        inner = value[1:-1].strip()
+        if inner == "":
+            return []
+        return [_parse_scalar(item) for item in inner.split(",")]
+    return _parse_scalar(value)
+
+
+def _parse_scalar(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value in ("true", "True", "yes"):
+        return True
+    if value in ("false", "False", "no"):
+        return False
+    return value
+
+
+def normalize_tags(tags):
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return [str(tag).strip() for tag in tags if str(tag).strip() != ""]
+
+
+def split_front_matter(numbered, metadata):
+    # Consumes a leading front matter block from (number, line) pairs into
+    # metadata and yields the remaining lines. An unclosed block is yielded
+    # back untouched.
+    numbered = iter(numbered)
+    first = next(numbered, None)
+    if first is None:
+        return
+    if first[1].strip() != FRONT_MATTER_FENCE:
+        yield first
+        yield from numbered
+        return
+    header = [first]
+    for item in numbered:
+        header.append(item)
+        if item[1].strip() == FRONT_MATTER_FENCE:
+            metadata.update(parse_front_matter(line for _, line in header[1:-1]))
+            yield from numbered
+            return
+    yield from header
+
+
+def read_front_matter(path):
+    # Reads only the front matter block. read_page_metadata (markdown_blocks)
+    # also finds the title the way rendering does.
+    metadata = {}
+    with open(path, "r") as f:
+        numbered = enumerate((line.rstrip("\n") for line in f), 1)
+        for _ in split_front_matter(numbered, metadata):
+            break
+    return metadata
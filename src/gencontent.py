@@ -1,45 +1,324 @@
+import json
+import logging
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
+from htmlnode import ParentNode
+from frontmatter import read_front_matter
+from markdown_blocks import markdown_to_document, DocumentStream, scan_blocks, block_links, block_to_child_node, note_title, read_page_metadata
+from copystatic import prune_empty_dirs
+from manifest import hash_bytes, hash_file
+from scheduler import process_context
+from searchindex import page_terms
+from template import TemplateSet
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
-    for filename in os.listdir(dir_path_content):
+logger = logging.getLogger(__name__)
+
+# Sources at least this large are rendered block by block instead of as one
+# document.
+STREAMING_THRESHOLD = 4 * 1024 * 1024
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, jobs=1, stats=None, cache=None, search=False, minify=False, assets=None):
+    pages = find_pages(dir_path_content, dest_dir_path)
+    return generate_pages(pages, template_path, basepath, jobs, stats, cache, search, minify, assets)
+
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for filename in sorted(os.listdir(dir_path_content)):
         from_path = os.path.join(dir_path_content, filename)
         dest_path = os.path.join(dest_dir_path, filename)
         if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path, basepath)
+            pages.append((from_path, str(Path(dest_path).with_suffix(".html"))))
+        else:
+            pages.extend(find_pages(from_path, dest_path))
+    return pages
+
+def generate_pages(pages, template_path, basepath, jobs=1, stats=None, cache=None, search=False, minify=False, assets=None):
+    # When stats is a list, each page is rendered through the instrumented
+    # path and its measurements are appended in discovery order. Returns what
+    # was found on each page, keyed by destination path: its (line, url)
+    # "links" and, when search is set, its search "terms".
+    if len(pages) == 0:
+        return {}
+    templates = TemplateSet(template_path, basepath, minify, assets)
+    profile = stats is not None
+    tasks = [(from_path, templates, dest_path, profile, search) for from_path, dest_path in pages]
+    if jobs <= 1 or len(pages) == 1:
+        results = [_render_task(task, cache, False) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(
+            max_workers=jobs, mp_context=process_context(), initializer=_init_worker, initargs=(cache,)
+        ) as executor:
+            results = list(executor.map(_generate_page_task, tasks, chunksize=chunksize))
+        # Workers render against their own copy of the cache and hand back
+        # what they added.
+        if cache is not None:
+            for _, _, added, _ in results:
+                cache.merge(added)
+
+    if profile:
+        stats.extend(page_stats for _, page_stats, _, _ in results if page_stats is not None)
+    # Every page is attempted in a pool; the first failure in discovery order
+    # is raised so a parallel build reports the same error as a serial one.
+    for error, _, _, _ in results:
+        if error is not None:
+            raise error
+    return {dest_path: found for (_, dest_path), (_, _, _, found) in zip(pages, results)}
+
+_worker_cache = None
+
+def _init_worker(cache):
+    global _worker_cache
+    _worker_cache = cache
+    if cache is not None:
+        cache.record_added = True
+
+def _generate_page_task(task):
+    return _render_task(task, _worker_cache, True)
+
+def _render_task(task, cache, catch):
+    from_path, templates, dest_path, profile, search = task
+    page_stats = None
+    links = []
+    texts = [] if search else None
+    try:
+        if profile:
+            page_stats = generate_page_profiled(from_path, templates, dest_path, cache, links, texts)
         else:
-            generate_pages_recursive(from_path, template_path, dest_path, basepath)
+            generate_page(from_path, templates, dest_path, cache, links, texts)
+    except Exception as e:
+        if not catch:
+            raise
+        return e, None, {}, {}
+    added = cache.take_added() if cache is not None else {}
+    return None, page_stats, added, page_found(links, texts)
+
+def page_found(links, texts):
+    found = {"links": links}
+    if texts is not None:
+        found["terms"] = page_terms(texts)
+    return found
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath, manifest, jobs=1, stats=None, cache=None, search=False, minify=False, assets=None):
+    template_hashes = TemplateHashes(template_path)
+    old_pages = manifest["pages"]
+    new_pages = {}
+    stale = []
+    for from_path, dest_path in find_pages(dir_path_content, dest_dir_path):
+        entry = page_entry(from_path, template_hashes, basepath, minify, assets)
+        old_entry = old_pages.get(dest_path)
+        if old_entry is not None and is_page_current(old_entry, entry, dest_path, search):
+            new_pages[dest_path] = old_entry
+            continue
+        new_pages[dest_path] = entry
+        stale.append((from_path, dest_path))
+
+    found = generate_pages(stale, template_path, basepath, jobs, stats, cache, search, minify, assets)
+    rendered = []
+    for _, dest_path in stale:
+        new_pages[dest_path]["output_hash"] = hash_file(dest_path)
+        new_pages[dest_path].update(found[dest_path])
+        rendered.append(dest_path)
+
+    removed = []
+    for dest_path in old_pages:
+        if dest_path not in new_pages:
+            remove_output(dest_path, dest_dir_path)
+            removed.append(dest_path)
+
+    manifest["pages"] = new_pages
+    return rendered, removed
+
+def update_pages(source_paths, dir_path_content, template_path, dest_dir_path, basepath, manifest, cache=None, search=False, minify=False, assets=None):
+    # Re-renders or removes just the given source files, e.g. the ones a file
+    # watcher reported, without rescanning the rest of the content tree.
+    templates = TemplateSet(template_path, basepath, minify, assets)
+    template_hashes = TemplateHashes(template_path)
+    pages = manifest["pages"]
+    rendered = []
+    removed = []
+    for source_path in source_paths:
+        rel_path = os.path.relpath(source_path, dir_path_content)
+        from_path = os.path.join(dir_path_content, rel_path)
+        dest_path = str(Path(os.path.join(dest_dir_path, rel_path)).with_suffix(".html"))
+        if not os.path.isfile(from_path):
+            if dest_path in pages:
+                remove_output(dest_path, dest_dir_path)
+                del pages[dest_path]
+                removed.append(dest_path)
+            continue
+        links = []
+        texts = [] if search else None
+        generate_page(from_path, templates, dest_path, cache, links, texts)
+        entry = page_entry(from_path, template_hashes, basepath, minify, assets)
+        entry["output_hash"] = hash_file(dest_path)
+        entry.update(page_found(links, texts))
+        pages[dest_path] = entry
+        rendered.append(dest_path)
+    return rendered, removed
+
+def page_entries(pages, found, template_path, basepath, minify=False, assets=None):
+    # Manifest entries for pages generate_pages just rendered, keyed by their
+    # destination path, as a build that only wrote these pages records them.
+    template_hashes = TemplateHashes(template_path)
+    entries = {}
+    for from_path, dest_path in pages:
+        entry = page_entry(from_path, template_hashes, basepath, minify, assets)
+        entry["output_hash"] = hash_file(dest_path)
+        entry.update(found[dest_path])
+        entries[dest_path] = entry
+    return entries
+
+def page_entry(from_path, template_hashes, basepath, minify=False, assets=None):
+    return {
+        "source": from_path,
+        "source_hash": hash_file(from_path),
+        "template_hash": template_hashes.for_page(from_path),
+        "basepath": basepath,
+        "minify": minify,
+        "assets": assets_hash(assets),
+    }
+
+def assets_hash(assets):
+    # Any change to the asset map re-renders every page; which assets a page
+    # refers to is only known after rendering it.
+    if not assets:
+        return None
+    return hash_bytes(json.dumps(assets, sort_keys=True).encode())
+
+class TemplateHashes():
+    # Hash of the template each page renders with, read from its front matter.
+    def __init__(self, template_path):
+        self.templates = TemplateSet(template_path)
+        self.hashes = {}
 
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f" * {from_path} {template_path} -> {dest_path}")
+    def for_page(self, from_path):
+        path = self.templates.resolve(read_front_matter(from_path).get("template"))
+        if path not in self.hashes:
+            self.hashes[path] = hash_file(path) if os.path.isfile(path) else None
+        return self.hashes[path]
+
+def is_page_current(old_entry, entry, dest_path, search=False):
+    for key in ("source", "source_hash", "template_hash", "basepath", "minify", "assets"):
+        if old_entry.get(key) != entry[key]:
+            return False
+    # Entries missing what this build collects while rendering (written by an
+    # older version, or by a build without search) are rendered once more.
+    if "links" not in old_entry or (search and "terms" not in old_entry):
+        return False
+    if not os.path.isfile(dest_path):
+        return False
+    return old_entry.get("output_hash") == hash_file(dest_path)
+
+def remove_output(dest_path, dest_dir_path):
+    logger.info(" * removing %s", dest_path)
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    prune_empty_dirs(dest_path, dest_dir_path)
+
+def generate_page(from_path, templates, dest_path, cache=None, links=None, texts=None):
+    if os.path.getsize(from_path) >= STREAMING_THRESHOLD:
+        generate_page_streaming(from_path, templates, dest_path, cache, links, texts)
+        return
     from_file = open(from_path, "r")
     markdown_content = from_file.read()
     from_file.close()
 
-    template_file = open(template_path, "r")
-    template = template_file.read()
-    template_file.close()
+    node, metadata = markdown_to_document(markdown_content, cache, links, texts)
+    template = templates.get(metadata.get("template"))
+    logger.info(" * %s %s -> %s", from_path, template.path, dest_path)
+
+    dest_dir_path = os.path.dirname(dest_path)
+    if dest_dir_path != "":
+        os.makedirs(dest_dir_path, exist_ok=True)
+    to_file = open(dest_path, "w")
+    template.write(to_file, Title=metadata["title"], Content=node)
+    to_file.close()
+
+def generate_page_streaming(from_path, templates, dest_path, cache=None, links=None, texts=None):
+    # Same output as generate_page, but memory use follows the largest block
+    # rather than the document: a first pass stops as soon as the title is
+    # known, then the second parses, renders and writes one block at a time.
+    metadata = read_page_metadata(from_path)
+    if "title" not in metadata:
+        raise ValueError("no title found")
+    template = templates.get(metadata.get("template"))
+    logger.info(" * %s %s -> %s (streamed)", from_path, template.path, dest_path)
 
-    node = markdown_to_html_node(markdown_content)
+    dest_dir_path = os.path.dirname(dest_path)
+    if dest_dir_path != "":
+        os.makedirs(dest_dir_path, exist_ok=True)
+    with open(from_path, "r") as from_file, open(dest_path, "w") as to_file:
+        template.write(to_file, Title=metadata["title"], Content=DocumentStream(from_file, cache, links, texts))
+
+def generate_page_profiled(from_path, templates, dest_path, cache=None, links=None, texts=None):
+    # Same output as generate_page, but each stage runs to completion on its
+    # own so it can be timed: read, block parse, inline parse, serialize,
+    # template fill and write.
+    timings = {}
+    start = time.perf_counter()
+    with open(from_path, "r") as f:
+        markdown_content = f.read()
+    timings["read"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    metadata = {}
+    blocks = list(scan_blocks(markdown_content.split("\n"), metadata))
+    for block in blocks:
+        note_title(metadata, block)
+        if links is not None:
+            links.extend(block_links(block))
+    if "title" not in metadata:
+        raise ValueError("no title found")
+    timings["block_parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    children = [block_to_child_node(block, cache, texts) for block in blocks]
+    node = ParentNode.trusted("div", children, None)
+    timings["inline_parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
     html = node.to_html()
+    timings["serialize"] = time.perf_counter() - start
 
-    title = extract_title(markdown_content)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", html)
-    template = template.replace('href="/', 'href="' + basepath)
-    template = template.replace('src="/', 'src="' + basepath)
+    start = time.perf_counter()
+    template = templates.get(metadata.get("template"))
+    logger.info(" * %s %s -> %s", from_path, template.path, dest_path)
+    page = template.render(Title=metadata["title"], Content=html)
+    timings["template"] = time.perf_counter() - start
 
+    start = time.perf_counter()
     dest_dir_path = os.path.dirname(dest_path)
     if dest_dir_path != "":
         os.makedirs(dest_dir_path, exist_ok=True)
-    to_file = open(dest_path, "w")
-    to_file.write(template)
+    with open(dest_path, "w") as f:
+        f.write(page)
+    timings["write"] = time.perf_counter() - start
+
+    return {
+        "source": from_path,
+        "dest": str(dest_path),
+        "timings": timings,
+        "total": sum(timings.values()),
+        "source_bytes": len(markdown_content.encode()),
+        "html_bytes": len(html.encode()),
+        "output_bytes": len(page.encode()),
+        "blocks": len(blocks),
+        "nodes": count_nodes(node),
+    }
+
+def count_nodes(node):
+    count = 1
+    if node.children is not None:
+        for child in node.children:
+            count += count_nodes(child)
+    return count
 
 def extract_title(md):
     lines = md.split("\n")
     for line in lines:
         if line.startswith("# "):
             return line[2:]
-    raise ValueError("no title found")
\ No newline at end of file
+    raise ValueError("no title found")
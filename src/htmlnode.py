@@ -1,4 +1,6 @@
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,6 +10,13 @@ class HTMLNode():
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
 
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, stream):
+        for fragment in self.iter_html():
+            stream.write(fragment)
+
     def props_to_html(self):
         if self.props is None:
             return ""
@@ -23,8 +32,13 @@ class HTMLNode():
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag=tag, value=value, children=None, props=props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def to_html(self):
         if self.value is None:
@@ -34,8 +48,13 @@ class LeafNode(HTMLNode):
         else:
             attrs = self.props_to_html()
             return f"<{self.tag}{attrs}>{self.value}</{self.tag}>"
+
+    def iter_html(self):
+        yield self.to_html()
         
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         if tag is None:
             raise ValueError("ParentNode must have a tag")
@@ -46,8 +65,22 @@ class ParentNode(HTMLNode):
                     raise ValueError("ParentNode children must be HTMLNode instances")
                 
         super().__init__(tag=tag, children=children, props=props)
+
+    @classmethod
+    def trusted(cls, tag, children, props=None):
+        # For internal builders whose children are known to be HTMLNodes;
+        # skips the per-child validation done by __init__.
+        node = cls.__new__(cls)
+        node.tag = tag
+        node.value = None
+        node.children = children
+        node.props = props
+        return node
     
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         if self.tag is None:
             raise ValueError("ParentNode must have a tag")
         if self.children is None:
@@ -55,9 +88,10 @@ class ParentNode(HTMLNode):
         if not isinstance(self.children, list):
             raise ValueError("ParentNode children must be a list")
         
-        props = self.props_to_html()
-        inner = "".join(child.to_html() for child in self.children)
-        return f"<{self.tag}{props}>{inner}</{self.tag}>"
+        yield f"<{self.tag}{self.props_to_html()}>"
+        for child in self.children:
+            yield from child.iter_html()
+        yield f"</{self.tag}>"
 
         
             
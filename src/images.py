@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from copystatic import copy_file
+from scheduler import process_context
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Bumping this invalidates every cached image.
+OPTIMIZER_VERSION = 2
+# Ancillary chunks that change how pixels look; everything else (text,
+# timestamps, physical size, ...) is dropped.
+KEEP_CHUNKS = {b"IHDR", b"PLTE", b"IDAT", b"IEND", b"tRNS", b"sRGB", b"gAMA", b"cHRM", b"iCCP", b"sBIT"}
+# Chunks of an animated PNG; the other frames live outside IDAT, so such
+# files are left alone.
+ANIMATION_CHUNKS = {b"acTL", b"fcTL", b"fdAT"}
+STRATEGIES = [zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED]
+
+
+def is_png(rel_path):
+    return rel_path.lower().endswith(".png")
+
+
+def read_chunks(data):
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        if pos + 8 > len(data):
+            raise ValueError("truncated PNG chunk header")
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        crc = data[pos + 8 + length:pos + 12 + length]
+        if len(body) != length or len(crc) != 4:
+            raise ValueError(f"truncated PNG chunk {chunk_type!r}")
+        if struct.unpack(">I", crc)[0] != zlib.crc32(chunk_type + body):
+            raise ValueError(f"bad CRC in PNG chunk {chunk_type!r}")
+        chunks.append((chunk_type, body))
+        pos += 12 + length
+        if chunk_type == b"IEND":
+            break
+    if not chunks or chunks[0][0] != b"IHDR" or chunks[-1][0] != b"IEND":
+        raise ValueError("PNG must start with IHDR and end with IEND")
+    return chunks
+
+
+def write_chunk(chunk_type, body):
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+
+def deflate(raw):
+    best = None
+    for strategy in STRATEGIES:
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        data = compressor.compress(raw) + compressor.flush()
+        if best is None or len(data) < len(best):
+            best = data
+    return best
+
+
+def optimize_png(data):
+    # Lossless: the filtered scanlines are kept as they are and only
+    # re-deflated, so decoders see the same pixels. The original is returned
+    # when the result would not be smaller.
+    chunks = read_chunks(data)
+    if any(chunk_type in ANIMATION_CHUNKS for chunk_type, _ in chunks):
+        return data
+    raw = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+    out = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if raw is not None:
+                out.append(write_chunk(b"IDAT", deflate(raw)))
+                raw = None
+        elif chunk_type in KEEP_CHUNKS:
+            out.append(write_chunk(chunk_type, body))
+    optimized = b"".join(out)
+    if len(optimized) >= len(data):
+        return data
+    return optimized
+
+
+def image_key(from_path):
+    digest = hashlib.sha256(f"{OPTIMIZER_VERSION}\0".encode())
+    with open(from_path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def optimize_images(rel_paths, source_dir_path, dest_dir_path, cache_dir_path, jobs=1):
+    # Each source image is looked up by content hash in cache_dir_path, so a
+    # given image is only ever recompressed once; misses are processed in a
+    # worker pool. Returns (rel_path, source_bytes, output_bytes) per image.
+    os.makedirs(cache_dir_path, exist_ok=True)
+    images = []
+    missing = {}
+    for rel_path in rel_paths:
+        from_path = os.path.join(source_dir_path, rel_path)
+        cache_path = os.path.join(cache_dir_path, image_key(from_path) + ".png")
+        images.append((rel_path, from_path, cache_path))
+        if not os.path.exists(cache_path):
+            missing[cache_path] = from_path
+
+    tasks = list(missing.items())
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks)), mp_context=process_context()) as pool:
+            list(pool.map(_optimize_task, tasks))
+    else:
+        for task in tasks:
+            _optimize_task(task)
+
+    results = []
+    for rel_path, from_path, cache_path in images:
+        dest_path = os.path.join(dest_dir_path, rel_path)
+        # Replace rather than overwrite: the destination may be a hardlink
+        # to the source image.
+        tmp_path = dest_path + ".tmp"
+        copy_file(cache_path, tmp_path, link=True)
+        os.replace(tmp_path, dest_path)
+        results.append((rel_path, os.path.getsize(from_path), os.path.getsize(cache_path)))
+    return results
+
+
+def _optimize_task(task):
+    cache_path, from_path = task
+    with open(from_path, "rb") as f:
+        data = f.read()
+    try:
+        optimized = optimize_png(data)
+    except (ValueError, zlib.error) as e:
+        logger.warning("Not optimizing %s: %s", from_path, e)
+        optimized = data
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(optimized)
+    os.replace(tmp_path, cache_path)
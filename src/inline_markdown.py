@@ -22,11 +22,20 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
         new_nodes.extend(split_nodes)
     return new_nodes
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+INLINE_MARKER_PATTERN = re.compile(r"\*\*|[_`\[]|!\[")
+DELIMITERS = {
+    "**": TextType.BOLD,
+    "_": TextType.ITALIC,
+    "`": TextType.CODE,
+}
+
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
 def split_nodes_image(old_nodes):
     new_nodes = []
@@ -81,10 +90,45 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    return nodes
\ No newline at end of file
+    # Scans left to right once: each marker either opens a formatted span,
+    # an image or a link, or is left as plain text.
+    nodes = []
+    text_start = 0
+    pos = 0
+    while True:
+        match = INLINE_MARKER_PATTERN.search(text, pos)
+        if match is None:
+            break
+        marker = match.group()
+        start = match.start()
+
+        if marker in DELIMITERS:
+            end = text.find(marker, match.end())
+            if end == -1:
+                raise ValueError("invalid markdown, formatted section not closed")
+            _append_text(nodes, text[text_start:start])
+            inner = text[match.end():end]
+            if inner != "":
+                nodes.append(TextNode(inner, DELIMITERS[marker]))
+            pos = text_start = end + len(marker)
+            continue
+
+        if marker == "![":
+            found = IMAGE_PATTERN.match(text, start)
+            text_type = TextType.IMAGE
+        else:
+            found = LINK_PATTERN.match(text, start)
+            text_type = TextType.LINK
+        if found is None:
+            pos = start + 1
+            continue
+        _append_text(nodes, text[text_start:start])
+        nodes.append(TextNode(found.group(1), text_type, found.group(2)))
+        pos = text_start = found.end()
+
+    _append_text(nodes, text[text_start:])
+    return nodes
+
+def _append_text(nodes, text):
+    if text != "":
+        nodes.append(TextNode(text, TextType.TEXT))
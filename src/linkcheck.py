@@ -0,0 +1,73 @@
+import os
+import posixpath
+import re
+import urllib.parse
+
+from copystatic import scan_files
+from siteindex import page_url
+
+TEMPLATE_URL_PATTERN = re.compile(r'(?:href|src)="([^"]*)"')
+
+
+def build_path_index(dest_paths, dest_dir_path, static_dir_path):
+    # Every path the site will serve, relative to its root with "/"
+    # separators: the rendered pages, everything under static/, and whatever
+    # else the build published (feeds, search index, fingerprinted assets).
+    index = set()
+    for dest_path in dest_paths:
+        index.add(os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/"))
+    for dir_path in (static_dir_path, dest_dir_path):
+        if os.path.isdir(dir_path):
+            index.update(rel_path for rel_path, _ in scan_files(dir_path))
+    return index
+
+
+def resolve_url(url, base_url=""):
+    # Maps a link found on the page at base_url ("" for the home page,
+    # "blog/tom/" for a post) to a site path. External links, and links to
+    # the page itself, give None.
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme != "" or parts.netloc != "" or parts.path == "":
+        return None
+    path = urllib.parse.unquote(parts.path)
+    is_dir = path.endswith("/")
+    base_dir = posixpath.dirname("/" + base_url)
+    path = posixpath.normpath(posixpath.join(base_dir, path)).lstrip("/")
+    if is_dir and path != "":
+        path += "/"
+    return path
+
+
+def is_served(path, index):
+    # Mirrors how GitHub Pages looks paths up: "dir" and "dir/" serve
+    # dir/index.html, and "page" serves page.html.
+    if path == "" or path.endswith("/"):
+        return path + "index.html" in index
+    return path in index or path + "/index.html" in index or path + ".html" in index
+
+
+def check_links(pages, index, dest_dir_path):
+    # pages holds (source, dest_path, links) with links as (line, url)
+    # pairs; returns the broken ones as sorted (source, line, url).
+    broken = []
+    for source, dest_path, links in pages:
+        base_url = page_url(dest_path, dest_dir_path)
+        for line, url in links:
+            path = resolve_url(url, base_url)
+            if path is not None and not is_served(path, index):
+                broken.append((source, line, url))
+    broken.sort()
+    return broken
+
+
+def template_links(template_path):
+    links = []
+    with open(template_path, "r") as f:
+        for number, line in enumerate(f, 1):
+            for url in TEMPLATE_URL_PATTERN.findall(line):
+                links.append((number, url))
+    return links
+
+
+def format_broken(broken):
+    return "\n".join(f"{source}:{line}: broken link {url}" for source, line, url in broken)
@@ -1,36 +1,703 @@
+import argparse
+import logging
 import os
 import shutil
 import sys
+import tempfile
 
-from copystatic import copy_files_recursive
-from gencontent import generate_pages_recursive
+from blockcache import load_block_cache
+from compress import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, compress_outputs, remove_compressed
+from copystatic import (
+    asset_map,
+    copy_file,
+    copy_files_recursive,
+    hash_assets,
+    load_asset_state,
+    save_asset_state,
+    scan_files,
+    sync_static,
+    sync_static_paths,
+    write_fingerprinted,
+)
+from feeds import (
+    DEFAULT_SITE_URL,
+    FEED_FILE,
+    SITEMAP_FILE,
+    feed_xml,
+    load_feed_cache,
+    save_feed_cache,
+    sitemap_xml,
+    write_if_changed,
+)
+from gencontent import (
+    find_pages,
+    generate_page,
+    generate_pages,
+    generate_pages_recursive,
+    generate_pages_incremental,
+    page_entries,
+    update_pages,
+)
+from images import is_png, optimize_images
+from linkcheck import build_path_index, check_links, format_broken, template_links
+from manifest import empty_manifest, load_manifest, save_manifest
+from profiling import build_report, profile_call, summarize, write_report
+from scheduler import Stage, run_stages
+from searchindex import remove_search_index, write_search_index
+import serve
+from shards import (
+    SHARD_MANIFEST,
+    SHARD_SITE,
+    format_conflicts,
+    load_shards,
+    merge_manifests,
+    merge_outputs,
+    parse_shard,
+    shard_manifest,
+    shard_pages,
+)
+from staging import reuse_unchanged, start_stage, swap_dirs, write_changes
+from siteindex import build_site_index, load_site_index, save_site_index
+from template import TemplateSet
+from watch import make_watcher, wait_for_changes
 
 dir_path_static = "./static"
 dir_path_public = "./docs"
 dir_path_content = "./content"
+dir_path_build = "./.build"
+dir_path_shards = "./docs.shards"
 template_path = "./template.html"
+manifest_path = os.path.join(dir_path_build, "manifest.json")
+block_cache_path = os.path.join(dir_path_build, "blocks.json")
+site_index_path = os.path.join(dir_path_build, "index.json")
+changes_path = os.path.join(dir_path_build, "changes.json")
+feed_cache_path = os.path.join(dir_path_build, "feed.json")
+image_cache_path = os.path.join(dir_path_build, "images")
+asset_state_path = os.path.join(dir_path_build, "assets.json")
+gzip_state_path = os.path.join(dir_path_build, "gzip.json")
 default_basepath = "/"
 
-def main():
-    basepath = default_basepath
-
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Generate the static site into ./docs")
+    parser.add_argument("basepath", nargs="?", default=default_basepath)
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-render pages whose inputs changed, keeping ./docs in place",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes used to render pages (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--hash-static",
+        action="store_true",
+        help="with --incremental, compare static files by content hash when their mtime changed",
+    )
+    parser.add_argument(
+        "--link-static",
+        action="store_true",
+        help="with --incremental, hardlink static files into ./docs instead of copying them",
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action="store_true",
+        help="losslessly recompress PNG files in static/ (results cached in .build/images)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="also write static assets as name.<hash>.ext and point page and template URLs at those copies",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="collapse whitespace in pages as they are written (except inside pre, code, script, style)",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="write precompressed .gz siblings next to compressible output files",
+    )
+    parser.add_argument(
+        "--gzip-level",
+        type=int,
+        default=DEFAULT_LEVEL,
+        choices=range(1, 10),
+        metavar="LEVEL",
+        help="zlib compression level used for --gzip (1-9)",
+    )
+    parser.add_argument(
+        "--gzip-min-size",
+        type=int,
+        default=DEFAULT_MIN_SIZE,
+        metavar="BYTES",
+        help="smallest file --gzip compresses",
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report internal links and images that do not resolve to a page or static file",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a client-side search index, sharded by term prefix, to ./docs/search",
+    )
+    parser.add_argument(
+        "--feeds",
+        action="store_true",
+        help="write sitemap.xml and an Atom feed of blog/ posts (feed.xml)",
+    )
+    parser.add_argument(
+        "--site-url",
+        default=DEFAULT_SITE_URL,
+        help="origin the site is served from, used for absolute URLs in --feeds output",
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="I/N",
+        help=f"render only shard I of N of the pages (partitioned by path hash) into {dir_path_shards}/I; "
+        "shard 0 also copies static files. Combine the shards with 'main.py merge'",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="build incrementally, then rebuild whatever content/, static/ or the template changes",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=64,
+        metavar="MB",
+        help="size bound of the on-disk cache of rendered blocks",
+    )
+    parser.add_argument(
+        "--no-block-cache",
+        action="store_true",
+        help="render every block instead of reusing cached HTML",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT",
+        help="time each rendered page by stage and write a JSON report to REPORT",
+    )
+    parser.add_argument(
+        "--profile-page",
+        metavar="SOURCE",
+        help="with --profile, also run cProfile and tracemalloc over this one content file",
+    )
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_true",
+        help="print every file as it is copied or rendered",
+    )
+    options = parser.parse_args(argv)
+    if options.shard is not None:
+        try:
+            options.shard = parse_shard(options.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        if options.incremental or options.watch:
+            parser.error("--shard is a full build and cannot be combined with --incremental or --watch")
+    if options.profile_page is not None:
+        if options.profile is None:
+            parser.error("--profile-page needs --profile")
+        sources = [os.path.normpath(from_path) for from_path, _ in find_pages(dir_path_content, dir_path_public)]
+        if os.path.normpath(options.profile_page) not in sources:
+            parser.error(f"--profile-page {options.profile_page} is not a content file")
+    return options
 
+def normalize_basepath(basepath):
     if not basepath.startswith("/"):
         basepath = "/" + basepath
     if not basepath.endswith("/"):
         basepath = basepath + "/"
+    return basepath
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        serve.main(sys.argv[2:], dir_path_content, dir_path_static, template_path)
+        return
+    merge = sys.argv[1:2] == ["merge"]
+    options = parse_args(sys.argv[2:] if merge else sys.argv[1:])
+    if merge and (options.shard is not None or options.incremental or options.watch):
+        sys.exit("merge combines full shard builds; --shard, --incremental and --watch do not apply")
+    basepath = normalize_basepath(options.basepath)
+    if options.jobs <= 0:
+        options.jobs = os.cpu_count() or 1
+    logging.basicConfig(
+        level=logging.INFO if options.verbose else logging.WARNING,
+        format="%(message)s",
+    )
+    stats = [] if options.profile else None
+    cache = None
+    if not options.no_block_cache:
+        cache = load_block_cache(block_cache_path, options.block_cache_size * 1024 * 1024)
+
+    pages = []
+    if merge:
+        try:
+            pages = merge_shards(basepath, options)
+        except ValueError as e:
+            sys.exit(f"Merge failed: {e}")
+    elif options.shard is not None:
+        build_shard(basepath, options, stats, cache)
+    elif options.watch:
+        watch_site(basepath, options, cache)
+    elif options.incremental:
+        pages = manifest_pages(build_incremental(basepath, options, stats, cache))
+    else:
+        pages = build_full(basepath, options, stats, cache)
+    if cache is not None:
+        cache.save(block_cache_path)
+    # A shard leaves the site-wide outputs, link check included, to merge.
+    # build_full updates the site index as one of its stages.
+    whole_site = not options.watch and options.shard is None
+    if whole_site and (merge or options.incremental):
+        update_site_index()
+
+    if options.profile:
+        write_profile(basepath, options, stats)
+    if options.check_links and whole_site and check_site_links(pages):
+        sys.exit(1)
+
+def build_full(basepath, options, stats=None, cache=None):
+    # Everything is built into a staging directory that replaces ./docs in
+    # one step, so the live site is never half-written. The stages before
+    # that run as soon as what they need is ready: static files are copied
+    # on one thread while pages render on another (or on --jobs workers).
+    # The manifest is rewritten to describe the new tree, so the next
+    # --incremental build starts from it.
+    stage_dir_path = start_stage(dir_path_public)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = empty_manifest()
+
+    def copy_static(results):
+        print("Copying static files to staging directory...")
+        files = scan_files(dir_path_static)
+        copy_files_recursive(dir_path_static, stage_dir_path)
+        optimize_static([rel_path for rel_path, _ in files], stage_dir_path, options)
+        for rel_path, stat in files:
+            manifest["static"][rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        manifest["optimized_images"] = optimized_images(manifest, options)
+    manifest["site_outputs"] = site_outputs(options)
+
+    def render_pages(results):
+        # Pages only need the asset hashes, not the copied files.
+        print("Generating content...")
+        asset_urls = asset_map(results["assets"]) if results["assets"] is not None else None
+        found = generate_pages_recursive(
+            dir_path_content, template_path, stage_dir_path, basepath, options.jobs, stats, cache,
+            options.search, options.minify, asset_urls,
+        )
+        stage_pages = find_pages(dir_path_content, stage_dir_path)
+        entries = page_entries(stage_pages, found, template_path, basepath, options.minify, asset_urls)
+        pages = []
+        for from_path, dest_path in stage_pages:
+            manifest["pages"][public_path(dest_path, stage_dir_path)] = entries[dest_path]
+            pages.append((from_path, public_path(dest_path, stage_dir_path), found[dest_path]))
+        return pages
+
+    stages = [
+        Stage("static", copy_static),
+        Stage("assets", lambda results: hash_static(options)),
+        Stage("fingerprint", lambda results: fingerprint_static(stage_dir_path, options, results["assets"]), ["static", "assets"]),
+        Stage("pages", render_pages, ["assets"]),
+    ]
+    written = ["fingerprint", "pages"]
+    # The site index is kept up to date for later builds even when neither
+    # --search nor --feeds reads it.
+    stages.append(Stage("index", lambda results: update_site_index()))
+    if options.search:
+        stages.append(Stage(
+            "search", lambda results: write_search(stage_dir_path, results["pages"], basepath, results["index"]),
+            ["pages", "index"],
+        ))
+        written.append("search")
+    if options.feeds:
+        stages.append(Stage("feeds", lambda results: write_feeds(stage_dir_path, basepath, options, results["index"]), ["index"]))
+        written.append("feeds")
+    stages.append(Stage("compress", lambda results: compress_output(stage_dir_path, options, dir_path_public), written))
+    results = run_stages(stages)
+    publish_stage(stage_dir_path)
+    save_manifest(manifest_path, manifest)
+    publish_gzip_state(results["compress"])
+    return results["pages"]
+
+def build_shard(basepath, options, stats=None, cache=None):
+    # Renders this shard's share of the pages into its own directory next to
+    # a partial manifest. Shards run as separate processes (on one machine or
+    # several) and share no state but the read-only inputs; merge_shards does
+    # everything that needs the whole site.
+    index, count = options.shard
+    shard_dir_path = os.path.join(dir_path_shards, str(index))
+    site_dir_path = os.path.join(shard_dir_path, SHARD_SITE)
+    if os.path.exists(shard_dir_path):
+        shutil.rmtree(shard_dir_path)
+    os.makedirs(site_dir_path)
+    manifest = shard_manifest(index, count, shard_settings(basepath, options))
+
+    if index == 0:
+        print("Copying static files to shard 0...")
+        manifest["static"], copied, _ = sync_static(dir_path_static, site_dir_path, {})
+        optimize_static(copied, site_dir_path, options)
+        manifest["optimized_images"] = optimized_images(manifest, options)
+    asset_urls = fingerprint_static(site_dir_path if index == 0 else None, options)
+
+    pages = shard_pages(find_pages(dir_path_content, site_dir_path), dir_path_content, index, count)
+    print(f"Generating content for shard {index}/{count} ({len(pages)} page(s))...")
+    found = generate_pages(
+        pages, template_path, basepath, options.jobs, stats, cache, options.search, options.minify, asset_urls
+    )
+    entries = page_entries(pages, found, template_path, basepath, options.minify, asset_urls)
+    for dest_path, entry in entries.items():
+        manifest["pages"][public_path(dest_path, site_dir_path)] = entry
+    save_manifest(os.path.join(shard_dir_path, SHARD_MANIFEST), manifest)
+    print(f"Shard {index}/{count} written to {shard_dir_path}")
+
+def shard_settings(basepath, options):
+    # Options that change what a shard writes; all shards must agree on them.
+    return {
+        "basepath": basepath,
+        "search": options.search,
+        "minify": options.minify,
+        "fingerprint": options.fingerprint,
+        "optimize_images": options.optimize_images,
+    }
+
+def merge_shards(basepath, options):
+    # Combines the shard outputs into ./docs the way build_full publishes:
+    # through a staging directory, after the site-wide stages. The merged
+    # manifest is kept so later --incremental builds start from it.
+    shards = load_shards(dir_path_shards)
+    settings = shards[0][1]["settings"]
+    if settings["basepath"] != basepath:
+        raise ValueError(f"shards were built for basepath {settings['basepath']}, not {basepath}")
+    if options.search and not settings["search"]:
+        raise ValueError("--search needs shards built with --search")
+
+    stage_dir_path = start_stage(dir_path_public)
+    print(f"Merging {len(shards)} shard(s)...")
+    sites = [(manifest["shard"][0], os.path.join(shard_dir_path, SHARD_SITE)) for shard_dir_path, manifest in shards]
+    conflicts = merge_outputs(sites, stage_dir_path)
+    manifest, page_conflicts = merge_manifests([manifest for _, manifest in shards])
+    conflicts.extend(page_conflicts)
+    if conflicts:
+        shutil.rmtree(stage_dir_path)
+        raise ValueError("shards overlap\n" + format_conflicts(conflicts))
+
+    manifest["site_outputs"] = site_outputs(options)
+    pages = manifest_pages(manifest)
+    if options.search:
+        write_search(stage_dir_path, pages, basepath, update_site_index())
+    if options.feeds:
+        write_feeds(stage_dir_path, basepath, options, update_site_index())
+    gzip_state = compress_output(stage_dir_path, options, dir_path_public)
+    publish_stage(stage_dir_path)
+    save_manifest(manifest_path, manifest)
+    publish_gzip_state(gzip_state)
+    return pages
+
+def publish_stage(stage_dir_path):
+    print("Publishing staged output...")
+    changed, deleted = reuse_unchanged(stage_dir_path, dir_path_public)
+    swap_dirs(stage_dir_path, dir_path_public)
+    write_changes(changes_path, changed, deleted)
+    print(f"{len(changed)} file(s) changed, {len(deleted)} removed (listed in {changes_path})")
+
+def public_path(dest_path, dir_path):
+    # Where a file written under dir_path ends up once published, spelled
+    # like the manifest keys find_pages gives incremental builds.
+    return os.path.normpath(os.path.join(dir_path_public, os.path.relpath(dest_path, dir_path)))
+
+def build_incremental(basepath, options, stats=None, cache=None):
+    manifest = load_manifest(manifest_path)
+    # Before the static sync, so a static file of the same name is copied
+    # back in place of a removed one.
+    remove_dropped_outputs(manifest, options)
+
+    print("Syncing static files to public directory...")
+    manifest["static"], copied, deleted = sync_static(
+        dir_path_static, dir_path_public, manifest["static"], options.hash_static, options.link_static
+    )
+    print(f"Copied {len(copied)} static file(s), removed {len(deleted)} stale file(s)")
+    place_images(copied, options, manifest)
+    asset_urls = fingerprint_static(dir_path_public, options)
+
+    print("Generating changed content...")
+    rendered, removed = generate_pages_incremental(
+        dir_path_content, template_path, dir_path_public, basepath, manifest, options.jobs, stats, cache,
+        options.search, options.minify, asset_urls,
+    )
+    save_manifest(manifest_path, manifest)
+    print(f"Rendered {len(rendered)} page(s), removed {len(removed)} stale page(s)")
+    if options.search:
+        write_search(dir_path_public, manifest_pages(manifest), basepath, update_site_index())
+    if options.feeds:
+        write_feeds(dir_path_public, basepath, options, update_site_index())
+    compress_output(dir_path_public, options)
+    return manifest
+
+def watch_site(basepath, options, cache=None):
+    manifest = build_incremental(basepath, options, cache=cache)
+    update_site_index()
+    # Per-page templates live next to the default one, so that directory is
+    # watched too (without its subdirectories, which hold ./docs).
+    template_dir_path = os.path.dirname(template_path) or "."
+    watcher = make_watcher([dir_path_content, dir_path_static], [template_path], flat_dirs=[template_dir_path])
+    print(f"Watching {dir_path_content}, {dir_path_static} and the templates in {template_dir_path} for changes...")
+    try:
+        while True:
+            changed = wait_for_changes(watcher)
+            try:
+                rebuild_changed(changed, basepath, options, manifest, cache)
+                if options.search:
+                    write_search(dir_path_public, manifest_pages(manifest), basepath, update_site_index())
+                if options.feeds:
+                    write_feeds(dir_path_public, basepath, options, update_site_index())
+                compress_output(dir_path_public, options)
+            except ValueError as e:
+                print(f"Build failed: {e}")
+            save_manifest(manifest_path, manifest)
+            update_site_index()
+            if options.check_links:
+                check_site_links(manifest_pages(manifest))
+            if cache is not None:
+                cache.save(block_cache_path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def rebuild_changed(changed, basepath, options, manifest, cache=None):
+    # A template edit re-renders the pages that use it but leaves static
+    # files alone, a Markdown edit re-renders only that page, and a static
+    # edit syncs only that file. Directory-level changes fall back to a
+    # rescan of their tree.
+    content_root = os.path.normpath(dir_path_content)
+    static_root = os.path.normpath(dir_path_static)
+    template = os.path.normpath(template_path)
+    template_dir = os.path.dirname(template) or "."
+    sources = []
+    assets = []
+    rescan_pages = False
+    rescan_static = False
+    for path in sorted(os.path.normpath(p) for p in changed):
+        name = os.path.basename(path)
+        if name.startswith(".") or name.endswith("~"):
+            continue
+        if path == template or path == template_dir or (
+            (os.path.dirname(path) or ".") == template_dir and path.endswith(".html")
+        ):
+            rescan_pages = True
+        elif is_within(path, content_root):
+            if os.path.isfile(path) or path.endswith(".md"):
+                sources.append(path)
+            else:
+                rescan_pages = True
+        elif is_within(path, static_root):
+            rel_path = os.path.relpath(path, static_root).replace(os.sep, "/")
+            if os.path.isfile(path) or rel_path in manifest["static"]:
+                assets.append(rel_path)
+            else:
+                rescan_static = True
+
+    if rescan_static:
+        manifest["static"], copied, deleted = sync_static(
+            dir_path_static, dir_path_public, manifest["static"], link=options.link_static
+        )
+    elif assets:
+        copied, deleted = sync_static_paths(
+            assets, dir_path_static, dir_path_public, manifest["static"], options.link_static
+        )
+    if rescan_static or assets:
+        place_images(copied, options, manifest)
+        # A changed asset changes the asset map; pages rendered against the
+        # old one are found stale by their manifest entry.
+        rescan_pages = rescan_pages or options.fingerprint
+    asset_urls = fingerprint_static(dir_path_public, options)
+    if rescan_pages:
+        generate_pages_incremental(
+            dir_path_content, template_path, dir_path_public, basepath, manifest, options.jobs,
+            cache=cache, search=options.search, minify=options.minify, assets=asset_urls,
+        )
+    elif sources:
+        update_pages(
+            sources, dir_path_content, template_path, dir_path_public, basepath, manifest, cache,
+            options.search, options.minify, asset_urls,
+        )
+
+def site_outputs(options):
+    return [name for name, wanted in (("search", options.search), ("feeds", options.feeds)) if wanted]
+
+def remove_dropped_outputs(manifest, options):
+    # Search and feed files published by an earlier build are removed once
+    # --search or --feeds is dropped, like fingerprinted copies are.
+    dropped = set(manifest["site_outputs"]) - set(site_outputs(options))
+    if "search" in dropped:
+        removed = remove_search_index(os.path.join(dir_path_public, "search"))
+        print(f"Removed {len(removed)} search index file(s) left by --search")
+    if "feeds" in dropped:
+        for name in (SITEMAP_FILE, FEED_FILE):
+            path = os.path.join(dir_path_public, name)
+            if os.path.isfile(path):
+                os.remove(path)
+        print(f"Removed {SITEMAP_FILE} and {FEED_FILE} left by --feeds")
+    manifest["site_outputs"] = site_outputs(options)
+
+def optimized_images(manifest, options):
+    if not options.optimize_images:
+        return []
+    return [rel_path for rel_path in sorted(manifest["static"]) if is_png(rel_path)]
+
+def place_images(copied, options, manifest):
+    # Brings the PNGs in ./docs in line with --optimize-images: images just
+    # copied are optimized when it is on, and turning it on or off also
+    # replaces the unchanged images placed under the other setting.
+    previous = set(manifest["optimized_images"])
+    wanted = optimized_images(manifest, options)
+    copied = set(copied)
+    if options.optimize_images:
+        optimize_static([rel_path for rel_path in wanted if rel_path in copied or rel_path not in previous], dir_path_public, options)
+    else:
+        for rel_path in sorted(previous):
+            if rel_path in manifest["static"] and rel_path not in copied:
+                copy_file(os.path.join(dir_path_static, rel_path), os.path.join(dir_path_public, rel_path), options.link_static)
+    manifest["optimized_images"] = wanted
+
+def optimize_static(rel_paths, dest_dir_path, options):
+    images = [rel_path for rel_path in rel_paths if is_png(rel_path)]
+    if not options.optimize_images or not images:
+        return
+    print("Optimizing images...")
+    results = optimize_images(images, dir_path_static, dest_dir_path, image_cache_path, options.jobs)
+    saved = sum(before - after for _, before, after in results)
+    print(f"Optimized {len(results)} image(s), saved {saved} bytes")
+
+def hash_static(options):
+    if not options.fingerprint:
+        return None
+    return hash_assets(dir_path_static, load_asset_state(asset_state_path))
+
+def fingerprint_static(dest_dir_path, options, state=None):
+    # Returns the asset map pages are rendered with, or None. Fingerprinted
+    # copies from an earlier build are removed once the flag is dropped.
+    # Without a dest_dir_path (shards other than 0) only the map is worked
+    # out, and the saved hashes are left alone. state is what hash_static
+    # returned when the hashing already ran as a stage of its own.
+    previous = load_asset_state(asset_state_path)
+    if not options.fingerprint:
+        if previous and dest_dir_path is not None:
+            write_fingerprinted({}, dest_dir_path, previous)
+            save_asset_state(asset_state_path, {})
+        return None
+    if state is None:
+        state = hash_assets(dir_path_static, previous)
+    if dest_dir_path is None:
+        return asset_map(state)
+    written, removed = write_fingerprinted(state, dest_dir_path, previous)
+    save_asset_state(asset_state_path, state)
+    print(f"Fingerprinted {len(state)} asset(s): wrote {len(written)}, removed {len(removed)} stale")
+    return asset_map(state)
+
+def compress_output(dir_path, options, previous_dir_path=None):
+    # Returns the updated gzip state. It is saved here when dir_path is the
+    # live tree; staged builds save it once the stage is published. Without
+    # --gzip the .gz files of an earlier build are removed.
+    state = load_asset_state(gzip_state_path)
+    if not options.gzip:
+        if not state:
+            return None
+        removed = remove_compressed(dir_path, state)
+        if previous_dir_path is None:
+            save_asset_state(gzip_state_path, {})
+        print(f"Removed {len(removed)} .gz file(s) left by --gzip")
+        return {}
+    print("Compressing output...")
+    compressed, removed = compress_outputs(
+        dir_path, options.gzip_level, options.gzip_min_size, previous_dir_path, state=state
+    )
+    if previous_dir_path is None:
+        save_asset_state(gzip_state_path, state)
+    print(f"Compressed {len(compressed)} file(s), removed {len(removed)} stale .gz file(s)")
+    return state
+
+def publish_gzip_state(state):
+    if state is not None:
+        save_asset_state(gzip_state_path, state)
+
+def manifest_pages(manifest):
+    # (source, dest_path, found) for every page, where found holds what was
+    # collected while rendering it (see generate_pages).
+    return [(entry["source"], dest_path, entry) for dest_path, entry in sorted(manifest["pages"].items())]
+
+def check_site_links(pages):
+    index = build_path_index([dest_path for _, dest_path, _ in pages], dir_path_public, dir_path_static)
+    home_path = os.path.join(dir_path_public, "index.html")
+    links = [(source, dest_path, found.get("links", [])) for source, dest_path, found in pages]
+    links.append((template_path, home_path, template_links(template_path)))
+    broken = check_links(links, index, dir_path_public)
+    if broken:
+        print(format_broken(broken))
+    print(f"Checked links: {len(broken)} broken")
+    return broken
+
+def write_search(dest_dir_path, pages, basepath, index):
+    # Titles and draft flags come from the site index; drafts are left out.
+    entries = {entry["source"]: entry for entry in index}
+    search_pages = []
+    for source, _, found in pages:
+        entry = entries.get(source)
+        if entry is None or entry["draft"]:
+            continue
+        search_pages.append((basepath + entry["url"], entry["title"], found.get("terms", [])))
+    written, removed = write_search_index(os.path.join(dest_dir_path, "search"), search_pages)
+    print(f"Search index: {len(search_pages)} page(s), wrote {len(written)} file(s), removed {len(removed)}")
+
+def write_feeds(dest_dir_path, basepath, options, index):
+    base_url = options.site_url.rstrip("/") + basepath
+    feed, feed_cache, rebuilt = feed_xml(index, base_url, load_feed_cache(feed_cache_path))
+    write_if_changed(os.path.join(dest_dir_path, SITEMAP_FILE), sitemap_xml(index, base_url))
+    write_if_changed(os.path.join(dest_dir_path, FEED_FILE), feed)
+    save_feed_cache(feed_cache_path, feed_cache)
+    print(f"Wrote {SITEMAP_FILE} and {FEED_FILE} ({len(rebuilt)} feed entr{'y' if len(rebuilt) == 1 else 'ies'} rebuilt)")
 
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+def write_profile(basepath, options, stats):
+    report = build_report(stats)
+    if options.profile_page:
+        wanted = os.path.normpath(options.profile_page)
+        for from_path, _ in find_pages(dir_path_content, dir_path_public):
+            if os.path.normpath(from_path) == wanted:
+                # Rendered the way the build rendered it, but into a scratch
+                # file: the published page is not touched.
+                templates = TemplateSet(template_path, basepath, options.minify, fingerprint_static(None, options))
+                prof_path = os.path.splitext(options.profile)[0] + ".prof"
+                with tempfile.TemporaryDirectory() as scratch_dir_path:
+                    report["page_profile"] = profile_call(
+                        generate_page, from_path, templates, os.path.join(scratch_dir_path, "index.html"), None,
+                        prof_path=prof_path,
+                    )
+                report["page_profile"]["source"] = from_path
+                report["page_profile"]["prof_path"] = prof_path
+                break
+    write_report(options.profile, report)
+    print(summarize(report))
+    print(f"Profile report written to {options.profile}")
 
-    print("Copying static files to public directory...")
-    copy_files_recursive(dir_path_static, dir_path_public)
+def update_site_index():
+    pages = find_pages(dir_path_content, dir_path_public)
+    index = build_site_index(pages, dir_path_public, load_site_index(site_index_path))
+    save_site_index(site_index_path, index)
+    return index
 
-    print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public, basepath)
+def is_within(path, root):
+    return path == root or path.startswith(root + os.sep)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def empty_manifest():
+    # optimized_images lists the static PNGs whose published copy is the
+    # --optimize-images output rather than the source file; site_outputs the
+    # site-wide files ("search", "feeds") the last build published.
+    return {"version": MANIFEST_VERSION, "pages": {}, "static": {}, "optimized_images": [], "site_outputs": []}
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return empty_manifest()
+    with open(path, "r") as f:
+        try:
+            manifest = json.load(f)
+        except ValueError:
+            return empty_manifest()
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    for key, value in empty_manifest().items():
+        manifest.setdefault(key, value)
+    return manifest
+
+
+def save_manifest(path, manifest):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
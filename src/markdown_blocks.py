@@ -1,9 +1,15 @@
+import re
 from enum import Enum
 
-from htmlnode import ParentNode
-from inline_markdown import text_to_textnodes
+from frontmatter import split_front_matter
+from htmlnode import LeafNode, ParentNode
+from inline_markdown import extract_markdown_images, extract_markdown_links, text_to_textnodes
 from textnode import text_node_to_html_node, TextNode, TextType
 
+INLINE_CODE_PATTERN = re.compile(r"`[^`]*`")
+TEXT_KEY_SUFFIX = ":text"
+TEXT_SEPARATOR = "\0"
+
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -12,102 +18,262 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
 
-def markdown_to_blocks(markdown):
-    new_blocks = markdown.split("\n\n")
-    stripped = []
-    for block in new_blocks:
-        clean = block.strip()
-        if clean != "":
-            stripped.append(clean)
-    return stripped
+class Block():
+    def __init__(self, block_type, lines, line=1):
+        self.block_type = block_type
+        self.lines = lines
+        self.line = line
 
-def block_to_block_type(markdown):
+    def __eq__(self, other):
+        return isinstance(other, Block) and (self.block_type, self.lines, self.line) == (other.block_type, other.lines, other.line)
+
+    def __repr__(self):
+        return f"Block({self.block_type.value}, {self.lines}, line {self.line})"
+
+class BlockBuilder():
+    # Collects the lines of one block and narrows down its type as each line
+    # arrives, so a finished block is classified without another scan.
+    def __init__(self, line):
+        self.line = line
+        self.lines = []
+        self.is_quote = True
+        self.quote_has_text = False
+        self.is_unordered = True
+        self.is_ordered = True
+
+    def add(self, line):
+        if len(self.lines) == 0:
+            line = line.lstrip()
+        s = line.strip()
+        if self.is_quote:
+            if s.startswith(">"):
+                if s.lstrip(">").strip() != "":
+                    self.quote_has_text = True
+            else:
+                self.is_quote = False
+        if self.is_unordered and not s.startswith("- "):
+            self.is_unordered = False
+        if self.is_ordered and not s.startswith(f"{len(self.lines) + 1}. "):
+            self.is_ordered = False
+        self.lines.append(line)
+
+    def block_type(self):
+        lines = self.lines
+        if is_heading(lines[0]):
+            return BlockType.HEADING
+        if len(lines) >= 2 and lines[0] == "```" and lines[-1] == "```":
+            return BlockType.CODE
+        if self.is_quote and self.quote_has_text:
+            return BlockType.QUOTE
+        if self.is_unordered:
+            return BlockType.UNORDERED_LIST
+        if self.is_ordered:
+            return BlockType.ORDERED_LIST
+        return BlockType.PARAGRAPH
+
+    def build(self):
+        self.lines[-1] = self.lines[-1].rstrip()
+        return Block(self.block_type(), self.lines, self.line)
+
+def is_heading(line):
     i = 0
-    while i < len(markdown) and markdown[i] == "#":
+    while i < len(line) and line[i] == "#":
         i += 1
-    if 1 <= i <= 6 and i < len(markdown) and markdown[i] == " " and i+1 < len(markdown) and markdown[i+1] != " ":
-        return BlockType.HEADING
-    
-    lines = markdown.split("\n")
-
-    if len(lines) >= 2 and lines[0] == "```" and lines[-1] == "```":
-        return BlockType.CODE
-    
-    is_quote = True
-    for line in lines:
-        s = line.strip()
-        if len(s) == 0 or not s.startswith(">"):
-            is_quote = False
-            break
-    if is_quote:
-        return BlockType.QUOTE
-    
-    is_unordered = True
-    for line in lines:
-        s = line.strip()
-        if len(s) == 0 or not s.startswith("- "):
-            is_unordered = False
-            break
-    if is_unordered:
-        return BlockType.UNORDERED_LIST
-    
-    is_ordered = True
-    expected = 1
-    matched_any = False
-    for line in lines:
-        s = line.strip()
-        if len(s) == 0 or not s.startswith(f"{expected}. "):
-            is_ordered = False
-            break
-        elif s.startswith(f"{expected}. "):
-            expected += 1
-            matched_any = True
-        else:
-            is_ordered = False
-            break
-    if is_ordered and matched_any:  
-        return BlockType.ORDERED_LIST
-    return BlockType.PARAGRAPH
+    return 1 <= i <= 6 and i + 1 < len(line) and line[i] == " " and line[i + 1] != " "
+
+def is_fence(line):
+    return line.strip() == "```"
+
+def scan_blocks(lines, metadata=None):
+    # Walks the document once, yielding each block as soon as it is complete.
+    # When a metadata dict is given, leading front matter is parsed into it
+    # instead of being treated as content.
+    numbered = enumerate((line.rstrip("\n") for line in lines), 1)
+    if metadata is not None:
+        numbered = split_front_matter(numbered, metadata)
+    return _scan_numbered_lines(numbered, True)
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+def _scan_numbered_lines(numbered, fences):
+    builder = None
+    fence = None
+    for number, line in numbered:
+        if fence is not None:
+            fence.append((number, line))
+            if is_fence(line):
+                yield _fenced_block(fence)
+                fence = None
+            continue
+
+        if line.strip() == "":
+            if builder is not None:
+                yield builder.build()
+                builder = None
+            continue
+
+        if builder is None:
+            # A fence opening a block runs to the next fence line, blank
+            # lines included.
+            if fences and is_fence(line):
+                fence = [(number, line)]
+                continue
+            builder = BlockBuilder(number)
+        builder.add(line)
+
+    if builder is not None:
+        yield builder.build()
+    if fence is not None:
+        # Unclosed fence: nothing after it is a fence either, so the buffered
+        # lines are scanned again as ordinary text.
+        yield from _scan_numbered_lines(fence, False)
+
+def _fenced_block(fence):
+    lines = [line for _, line in fence]
+    lines[0] = lines[0].strip()
+    lines[-1] = lines[-1].strip()
+    return Block(BlockType.CODE, lines, fence[0][0])
+
+def markdown_to_blocks(markdown):
+    return ["\n".join(block.lines) for block in scan_blocks(markdown.split("\n"))]
+
+def block_to_block_type(markdown):
+    builder = BlockBuilder(1)
+    for line in markdown.split("\n"):
+        builder.add(line)
+    return builder.block_type()
+
+def markdown_to_html_node(markdown, cache=None):
     children = []
-    for block in blocks:
-        html_node = block_to_html_node(block)
-        children.append(html_node)
-    return ParentNode("div", children, None)
+    for block in scan_blocks(markdown.split("\n")):
+        children.append(block_to_child_node(block, cache))
+    return ParentNode.trusted("div", children, None)
+
+def markdown_to_document(markdown, cache=None, links=None, texts=None):
+    # Like markdown_to_html_node, but also returns the page metadata: front
+    # matter fields, with the title falling back to the first "# " heading.
+    # When links is a list, the (line, url) of every link and image is
+    # appended to it; when texts is, so is the text of every TextNode.
+    metadata = {}
+    children = []
+    for block in scan_blocks(markdown.split("\n"), metadata):
+        note_title(metadata, block)
+        if links is not None:
+            links.extend(block_links(block))
+        children.append(block_to_child_node(block, cache, texts))
+    if "title" not in metadata:
+        raise ValueError("no title found")
+    return ParentNode.trusted("div", children, None), metadata
+
+class DocumentStream():
+    # Stands in for the document node of a page too large to hold in memory.
+    # Blocks are pulled from lines (e.g. an open file) and rendered one at a
+    # time as the HTML is consumed, so it can only be iterated once.
+    def __init__(self, lines, cache=None, links=None, texts=None):
+        self.lines = lines
+        self.cache = cache
+        self.links = links
+        self.texts = texts
+
+    def iter_html(self):
+        yield "<div>"
+        for block in scan_blocks(self.lines, {}):
+            if self.links is not None:
+                self.links.extend(block_links(block))
+            yield from block_to_child_node(block, self.cache, self.texts).iter_html()
+        yield "</div>"
+
+    def write_html(self, stream):
+        for fragment in self.iter_html():
+            stream.write(fragment)
+
+def note_title(metadata, block):
+    if "title" not in metadata and block.block_type == BlockType.HEADING and block.lines[0].startswith("# "):
+        metadata["title"] = block.lines[0][2:].strip()
+
+def read_page_metadata(path):
+    # Front matter plus, when it has no title, the first "# " heading block,
+    # reading only as far as needed.
+    metadata = {}
+    with open(path, "r") as f:
+        for block in scan_blocks(f, metadata):
+            note_title(metadata, block)
+            if "title" in metadata:
+                break
+    return metadata
+
+def block_links(block):
+    # Link and image targets with the line they are on, read from the source
+    # lines so that blocks served from the cache are covered too. Code, both
+    # fenced and inline, is skipped.
+    if block.block_type == BlockType.CODE:
+        return []
+    links = []
+    for number, line in enumerate(block.lines, block.line):
+        if "](" not in line:
+            continue
+        line = INLINE_CODE_PATTERN.sub("", line)
+        for _, url in extract_markdown_images(line):
+            links.append((number, url))
+        for _, url in extract_markdown_links(line):
+            links.append((number, url))
+    return links
+
+def block_to_child_node(block, cache=None, texts=None):
+    if cache is None:
+        return block_lines_to_html_node(block.block_type, block.lines, texts)
+    # Cached blocks are spliced in as raw HTML without being parsed again.
+    # When texts are wanted, the block's text is cached next to its HTML.
+    key = cache.key(block.block_type, block.lines)
+    html = cache.get(key)
+    text = None
+    if html is not None and texts is not None:
+        text = cache.get(key + TEXT_KEY_SUFFIX)
+    if html is None or (texts is not None and text is None):
+        found = [] if texts is not None else None
+        html = block_lines_to_html_node(block.block_type, block.lines, found).to_html()
+        cache.put(key, html)
+        if found is not None:
+            text = TEXT_SEPARATOR.join(found)
+            cache.put(key + TEXT_KEY_SUFFIX, text)
+    if texts is not None and text != "":
+        texts.extend(text.split(TEXT_SEPARATOR))
+    return LeafNode(None, html)
 
 def block_to_html_node(block):
-    block_type = block_to_block_type(block)
+    return block_lines_to_html_node(block_to_block_type(block), block.split("\n"))
+
+def block_lines_to_html_node(block_type, lines, texts=None):
+    # Code blocks contribute no text to texts.
     if block_type == BlockType.PARAGRAPH:
-        return paragraph_to_html_node(block)
+        return paragraph_to_html_node(lines, texts)
     if block_type == BlockType.HEADING:
-        return heading_to_html_node(block)
+        return heading_to_html_node(lines, texts)
     if block_type == BlockType.CODE:
-        return code_to_html_node(block)
+        return code_to_html_node(lines)
     if block_type == BlockType.ORDERED_LIST:
-        return olist_to_html_node(block)
+        return olist_to_html_node(lines, texts)
     if block_type == BlockType.UNORDERED_LIST:
-        return ulist_to_html_node(block)
+        return ulist_to_html_node(lines, texts)
     if block_type == BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_to_html_node(lines, texts)
     raise ValueError("invalid block type")
 
-def text_to_children(text):
+def text_to_children(text, texts=None):
     text_nodes = text_to_textnodes(text)
     children = []
     for text_node in text_nodes:
+        if texts is not None and text_node.text != "":
+            texts.append(text_node.text)
         html_node = text_node_to_html_node(text_node)
         children.append(html_node)
     return children
 
-def paragraph_to_html_node(block):
-    lines = block.split("\n")
+def paragraph_to_html_node(lines, texts=None):
     paragraph = " ".join(lines)
-    children = text_to_children(paragraph)
-    return ParentNode("p", children)
+    children = text_to_children(paragraph, texts)
+    return ParentNode.trusted("p", children)
 
-def heading_to_html_node(block):
+def heading_to_html_node(lines, texts=None):
+    block = "\n".join(lines)
     level = 0
     for char in block:
         if char == "#":
@@ -117,43 +283,40 @@ def heading_to_html_node(block):
     if level + 1 >= len(block):
         raise ValueError(f"invalid heading level: {level}")
     text = block[level + 1:]
-    children = text_to_children(text)
-    return ParentNode(f"h{level}", children)
+    children = text_to_children(text, texts)
+    return ParentNode.trusted(f"h{level}", children)
 
-def code_to_html_node(block):
-    if not block.startswith("```") or not block.endswith("```"):
+def code_to_html_node(lines):
+    if len(lines) < 2 or not lines[0].startswith("```") or not lines[-1].endswith("```"):
         raise ValueError("invalid code block")
-    text = block[4: -3]
+    text = "".join(line + "\n" for line in lines[1:-1])
     raw_text_node = TextNode(text, TextType.TEXT)
     child = text_node_to_html_node(raw_text_node)
-    code = ParentNode("code", [child])
-    return ParentNode("pre", [code])
+    code = ParentNode.trusted("code", [child])
+    return ParentNode.trusted("pre", [code])
 
-def olist_to_html_node(block):
-    items = block.split("\n")
+def olist_to_html_node(lines, texts=None):
     html_items = []
-    for item in items:
-        text = item[3:]
-        children = text_to_children(text)
-        html_items.append(ParentNode("li", children))
-    return ParentNode("ol", html_items)
-
-def ulist_to_html_node(block):
-    items = block.split("\n")
+    for i, item in enumerate(lines, 1):
+        text = item.strip()[len(f"{i}. "):]
+        children = text_to_children(text, texts)
+        html_items.append(ParentNode.trusted("li", children))
+    return ParentNode.trusted("ol", html_items)
+
+def ulist_to_html_node(lines, texts=None):
     html_items = []
-    for item in items:
-        text = item[2:]
-        children = text_to_children(text)
-        html_items.append(ParentNode("li", children))
-    return ParentNode("ul", html_items)
-
-def quote_to_html_node(block):
-    lines = block.split("\n")
+    for item in lines:
+        text = item.strip()[2:]
+        children = text_to_children(text, texts)
+        html_items.append(ParentNode.trusted("li", children))
+    return ParentNode.trusted("ul", html_items)
+
+def quote_to_html_node(lines, texts=None):
     new_lines = []
     for line in lines:
         if not line.startswith(">"):
             raise ValueError("invalid quote block")
         new_lines.append(line.lstrip(">").strip())
     content = " ".join(new_lines)
-    children = text_to_children(content)
-    return ParentNode("blockquote", children)
\ No newline at end of file
+    children = text_to_children(content, texts)
+    return ParentNode.trusted("blockquote", children)
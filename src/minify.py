@@ -0,0 +1,101 @@
+import io
+import re
+
+# Whitespace inside these elements is significant and passed through as is.
+RAW_TAGS = ("pre", "code", "textarea", "script", "style")
+WHITESPACE_PATTERN = re.compile(r"[ \t\n\r\f]+")
+# Text is not escaped, so a "<" only starts a tag when a name or one of
+# "/!?" follows it, and a tag (quoted values included) never runs past the
+# next "<". Anything else is passed through as text.
+TAG_START_PATTERN = re.compile(r"<[A-Za-z/!?]")
+TAG_PATTERN = re.compile(r"<[A-Za-z/!?](?:[^<>\"']|\"[^<\"]*\"|'[^<']*')*>")
+TAG_NAME_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)")
+
+
+class HtmlMinifier():
+    # Wraps a text stream and collapses each run of whitespace in text to a
+    # single newline (if the run had one) or space. Tags are passed through
+    # untouched, as is everything inside RAW_TAGS elements. It works on the
+    # fragments as they are written, keeping only an unfinished tag or
+    # whitespace run between calls, so output is linear in its size.
+    def __init__(self, stream):
+        self.stream = stream
+        self.raw_end = None
+        self.tail = ""
+
+    def write(self, text):
+        if self.tail.startswith("<") and ">" not in text and "<" not in text:
+            self.tail += text
+            return
+        text = self.tail + text
+        self.tail = ""
+        pos = 0
+        end = len(text)
+        out = []
+        while pos < end:
+            if self.raw_end is not None:
+                match = self.raw_end.search(text, pos)
+                if match is None:
+                    # Hold back a possible start of the closing tag.
+                    cut = text.rfind("<", pos)
+                    if cut == -1:
+                        cut = end
+                    out.append(text[pos:cut])
+                    self.tail = text[cut:]
+                    break
+                out.append(text[pos:match.end()])
+                pos = match.end()
+                self.raw_end = None
+                continue
+
+            lt = text.find("<", pos)
+            if lt == -1:
+                lt = end
+            if lt > pos:
+                collapsed = WHITESPACE_PATTERN.sub(_collapse, text[pos:lt])
+                if lt == end and collapsed[-1] in " \n":
+                    # A run at the end may continue in the next fragment.
+                    out.append(collapsed[:-1])
+                    self.tail = collapsed[-1]
+                    break
+                out.append(collapsed)
+                pos = lt
+                continue
+
+            if pos + 1 == end:
+                # Whether this starts a tag depends on the next fragment.
+                self.tail = text[pos:]
+                break
+            match = TAG_PATTERN.match(text, pos) if TAG_START_PATTERN.match(text, pos) else None
+            if match is None:
+                if TAG_START_PATTERN.match(text, pos) and text.find("<", pos + 1) == -1:
+                    # May still be a tag whose ">" is in a later fragment.
+                    self.tail = text[pos:]
+                    break
+                out.append("<")
+                pos += 1
+                continue
+            tag = match.group()
+            out.append(tag)
+            pos = match.end()
+            name = TAG_NAME_PATTERN.match(tag)
+            if name is not None and name.group(1).lower() in RAW_TAGS and not tag.endswith("/>"):
+                self.raw_end = re.compile(rf"</{name.group(1)}\s*>", re.IGNORECASE)
+        self.stream.write("".join(out))
+
+    def finish(self):
+        # Writes whatever was held back; the wrapped stream is left open.
+        self.stream.write(self.tail)
+        self.tail = ""
+
+
+def _collapse(match):
+    return "\n" if "\n" in match.group() else " "
+
+
+def minify_html(html):
+    out = io.StringIO()
+    minifier = HtmlMinifier(out)
+    minifier.write(html)
+    minifier.finish()
+    return out.getvalue()
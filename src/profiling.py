@@ -0,0 +1,72 @@
+import cProfile
+import io
+import json
+import pstats
+import tracemalloc
+
+PAGE_STAGES = ["read", "block_parse", "inline_parse", "serialize", "template", "write"]
+
+
+def build_report(page_stats):
+    totals = {stage: 0.0 for stage in PAGE_STAGES}
+    for page in page_stats:
+        for stage in PAGE_STAGES:
+            totals[stage] += page["timings"][stage]
+    return {
+        "pages": page_stats,
+        "totals": {
+            "pages": len(page_stats),
+            "seconds": sum(totals.values()),
+            "stages": totals,
+            "source_bytes": sum(page["source_bytes"] for page in page_stats),
+            "output_bytes": sum(page["output_bytes"] for page in page_stats),
+            "nodes": sum(page["nodes"] for page in page_stats),
+        },
+    }
+
+
+def write_report(path, report):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+def summarize(report, top=10):
+    totals = report["totals"]
+    lines = [
+        f"Profiled {totals['pages']} page(s) in {totals['seconds'] * 1000:.1f} ms "
+        f"({totals['source_bytes']} source bytes, {totals['nodes']} nodes)"
+    ]
+    for stage in PAGE_STAGES:
+        lines.append(f"  {stage:13} {totals['stages'][stage] * 1000:9.2f} ms")
+    slowest = sorted(report["pages"], key=lambda page: page["total"], reverse=True)[:top]
+    if slowest:
+        lines.append(f"Slowest {len(slowest)} page(s):")
+    for page in slowest:
+        lines.append(f"  {page['total'] * 1000:9.2f} ms  {page['source']} ({page['source_bytes']} bytes, {page['nodes']} nodes)")
+    return "\n".join(lines)
+
+
+def profile_call(func, *args, prof_path=None, top=25):
+    # Runs func once under cProfile and tracemalloc and returns what was seen.
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    try:
+        profiler.runcall(func, *args)
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if prof_path is not None:
+        profiler.dump_stats(prof_path)
+
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+    allocations = snapshot.statistics("lineno")[:top]
+    return {
+        "cprofile": out.getvalue(),
+        "tracemalloc_peak_bytes": peak,
+        "top_allocations": [
+            {"where": str(stat.traceback[0]), "bytes": stat.size, "count": stat.count}
+            for stat in allocations
+        ],
+    }
@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+
+class Stage():
+    # One step of a build. run is called with the results of the stages
+    # finished before it started (a dict keyed by stage name), which always
+    # include its deps; what it returns becomes its own result.
+    def __init__(self, name, run, deps=()):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Stage({self.name}, deps: {list(self.deps)})"
+
+
+def process_context():
+    # Process pools are started from stage threads, and forking a process
+    # with other threads running can copy a lock some thread holds. Workers
+    # come from a fork server (a fresh, single-threaded process) instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def stage_order(stages):
+    # Stages sorted so each comes after its deps, keeping the given order
+    # where the graph allows it.
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"duplicate stage: {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"stage {stage.name} depends on unknown stage {dep}")
+    order = []
+    placed = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(dep in placed for dep in stage.deps)]
+        if not ready:
+            raise ValueError(f"stages depend on each other in a cycle: {[stage.name for stage in remaining]}")
+        for stage in ready:
+            order.append(stage)
+            placed.add(stage.name)
+            remaining.remove(stage)
+    return order
+
+
+def run_stages(stages, max_workers=None, timings=None):
+    # Starts each stage on a thread as soon as all of its deps have finished,
+    # so independent stages overlap and the build takes about as long as its
+    # slowest chain of stages. Returns the results by stage name. After a
+    # stage fails nothing new is started, and once the running stages are
+    # done the first failure is raised. When timings is a dict it receives
+    # each stage's wall-clock seconds.
+    pending = stage_order(stages)
+    results = {}
+    running = {}
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers or max(1, len(pending))) as executor:
+        while True:
+            if error is None:
+                for stage in [stage for stage in pending if all(dep in results for dep in stage.deps)]:
+                    pending.remove(stage)
+                    running[executor.submit(_run_timed, stage, dict(results))] = stage
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    result, seconds = future.result()
+                except Exception as e:
+                    if error is None:
+                        error = e
+                    continue
+                logger.info("Stage %s finished in %.3fs", stage.name, seconds)
+                results[stage.name] = result
+                if timings is not None:
+                    timings[stage.name] = seconds
+    if error is not None:
+        raise error
+    return results
+
+
+def _run_timed(stage, results):
+    start = time.perf_counter()
+    result = stage.run(results)
+    return result, time.perf_counter() - start
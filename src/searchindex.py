@@ -0,0 +1,88 @@
+import json
+import os
+import re
+
+TERM_PATTERN = re.compile(r"\w+")
+MIN_TERM_LENGTH = 2
+SHARD_PREFIX_LENGTH = 2
+SHARD_NAME_PATTERN = re.compile(r"[a-z0-9]+")
+OTHER_SHARD = "_"
+PAGES_FILE = "pages.json"
+
+
+def tokenize(text):
+    return [term for term in TERM_PATTERN.findall(text.lower()) if len(term) >= MIN_TERM_LENGTH]
+
+
+def page_terms(texts):
+    terms = set()
+    for text in texts:
+        terms.update(tokenize(text))
+    return sorted(terms)
+
+
+def shard_name(term):
+    # Terms are grouped by their first characters so a browser only fetches
+    # the shard for what was typed; anything that would not make a portable
+    # file name shares one shard.
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    if SHARD_NAME_PATTERN.fullmatch(prefix):
+        return prefix
+    return OTHER_SHARD
+
+
+def build_search_index(pages):
+    # pages holds (url, title, terms). Page ids are positions in the returned
+    # page list, which is sorted by url so ids are stable between builds.
+    pages = sorted(pages)
+    shards = {}
+    for page_id, (_, _, terms) in enumerate(pages):
+        for term in terms:
+            shards.setdefault(shard_name(term), {}).setdefault(term, []).append(page_id)
+    page_list = [[url, title] for url, title, _ in pages]
+    return page_list, shards
+
+
+def write_search_index(dir_path, pages):
+    # Writes dir_path/pages.json and one <prefix>.json per shard, leaving
+    # files whose content is unchanged untouched and removing shards that are
+    # no longer needed. Returns the names written and removed.
+    page_list, shards = build_search_index(pages)
+    os.makedirs(dir_path, exist_ok=True)
+    files = {PAGES_FILE: {"pages": page_list}}
+    for name, terms in shards.items():
+        files[name + ".json"] = {term: terms[term] for term in sorted(terms)}
+
+    written = []
+    for name in sorted(files):
+        data = json.dumps(files[name], separators=(",", ":"), ensure_ascii=False).encode()
+        path = os.path.join(dir_path, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    continue
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(name)
+
+    removed = []
+    for name in sorted(os.listdir(dir_path)):
+        if name.endswith(".json") and name not in files:
+            os.remove(os.path.join(dir_path, name))
+            removed.append(name)
+    return written, removed
+
+
+def remove_search_index(dir_path):
+    # Removes the files write_search_index manages, and dir_path once empty.
+    # Returns the names removed.
+    if not os.path.isdir(dir_path):
+        return []
+    removed = []
+    for name in sorted(os.listdir(dir_path)):
+        if name.endswith(".json"):
+            os.remove(os.path.join(dir_path, name))
+            removed.append(name)
+    if not os.listdir(dir_path):
+        os.rmdir(dir_path)
+    return removed
@@ -0,0 +1,173 @@
+import argparse
+import functools
+import io
+import logging
+import os
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from markdown_blocks import markdown_to_document
+from template import load_template
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGES = 256
+
+
+class SiteRenderer():
+    # Renders content pages on request and keeps the most recently used ones
+    # in memory. An entry stays valid while the mtimes of its source and
+    # template are unchanged, so edits show up on the next request.
+    def __init__(self, content_dir_path, template_path, basepath="/", max_pages=DEFAULT_MAX_PAGES):
+        self.content_dir_path = content_dir_path
+        self.template_path = template_path
+        self.basepath = basepath
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.templates = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def find_source(self, url_path):
+        # "/" and "/blog/tom/" map to index.md, "/about.html" to about.md.
+        parts = [part for part in url_path.split("/") if part != ""]
+        if any(part in (".", "..") for part in parts):
+            return None
+        if url_path.endswith("/") or not parts:
+            parts.append("index.md")
+        elif parts[-1].endswith(".html"):
+            parts[-1] = parts[-1][:-len(".html")] + ".md"
+        else:
+            return None
+        from_path = os.path.join(self.content_dir_path, *parts)
+        if os.path.isfile(from_path):
+            return from_path
+        return None
+
+    def render(self, from_path):
+        with self.lock:
+            entry = self.pages.get(from_path)
+            if entry is not None and _is_current(entry[0]):
+                self.pages.move_to_end(from_path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        source_mtime = os.stat(from_path).st_mtime_ns
+        with open(from_path, "r") as f:
+            markdown = f.read()
+        node, metadata = markdown_to_document(markdown)
+        template_path = self.template_path
+        if metadata.get("template") is not None:
+            template_path = os.path.join(os.path.dirname(self.template_path), metadata["template"])
+        template, template_mtime = self._template(template_path)
+        out = io.StringIO()
+        template.write(out, Title=metadata["title"], Content=node)
+        html = out.getvalue().encode()
+
+        deps = ((from_path, source_mtime), (template_path, template_mtime))
+        with self.lock:
+            self.pages[from_path] = (deps, html)
+            self.pages.move_to_end(from_path)
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return html
+
+    def _template(self, template_path):
+        mtime = os.stat(template_path).st_mtime_ns
+        with self.lock:
+            entry = self.templates.get(template_path)
+            if entry is not None and entry[1] == mtime:
+                return entry
+        entry = (load_template(template_path, self.basepath), mtime)
+        with self.lock:
+            self.templates[template_path] = entry
+        return entry
+
+
+def _is_current(deps):
+    for path, mtime in deps:
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        except FileNotFoundError:
+            return False
+    return True
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    # Content pages are rendered by the SiteRenderer; every other path is
+    # served from the static directory by SimpleHTTPRequestHandler.
+    def __init__(self, *args, site=None, **kwargs):
+        self.site = site
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        if not self.send_page(True):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.send_page(False):
+            super().do_HEAD()
+
+    def send_page(self, with_body):
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        from_path = self.site.find_source(url_path)
+        if from_path is None:
+            if not url_path.endswith("/") and self.site.find_source(url_path + "/") is not None:
+                self.send_response(301)
+                self.send_header("Location", url_path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return True
+            return False
+        try:
+            html = self.site.render(from_path)
+        except (ValueError, OSError) as e:
+            self.send_error(500, f"Could not render {from_path}: {e}")
+            return True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(html)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if with_body:
+            self.wfile.write(html)
+        return True
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def make_server(site, static_dir_path, bind="127.0.0.1", port=8000):
+    handler = functools.partial(DevRequestHandler, site=site, directory=static_dir_path)
+    return ThreadingHTTPServer((bind, port), handler)
+
+
+def main(argv, content_dir_path, static_dir_path, template_path):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Preview the site, rendering pages on request")
+    parser.add_argument("--bind", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=DEFAULT_MAX_PAGES,
+        help="rendered pages kept in memory",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(message)s")
+
+    site = SiteRenderer(content_dir_path, template_path, max_pages=args.max_pages)
+    server = make_server(site, static_dir_path, args.bind, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serving {content_dir_path} and {static_dir_path} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,127 @@
+import filecmp
+import hashlib
+import json
+import os
+
+from copystatic import copy_file, scan_files
+from manifest import MANIFEST_VERSION, empty_manifest
+
+SHARD_MANIFEST = "manifest.json"
+SHARD_SITE = "site"
+
+
+def parse_shard(text):
+    # "i/N" selects shard i (counting from 0) of N.
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {text!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard {text}: need N >= 1 and 0 <= i < N")
+    return index, count
+
+
+def page_shard(rel_path, count):
+    # Hashes the path relative to the content directory, so every machine
+    # assigns a page to the same shard (hash() is salted per process).
+    digest = hashlib.sha256(rel_path.replace(os.sep, "/").encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def shard_pages(pages, dir_path_content, index, count):
+    return [
+        (from_path, dest_path)
+        for from_path, dest_path in pages
+        if page_shard(os.path.relpath(from_path, dir_path_content), count) == index
+    ]
+
+
+def shard_manifest(index, count, settings):
+    # A partial manifest: the pages this shard rendered, plus the static
+    # files for shard 0. settings are the build options every shard of one
+    # site has to agree on.
+    manifest = empty_manifest()
+    manifest["shard"] = [index, count]
+    manifest["settings"] = settings
+    return manifest
+
+
+def load_shards(root_path):
+    # Returns (shard_dir_path, manifest) for every shard under root_path in
+    # index order, after checking they form one complete build.
+    shards = []
+    if os.path.isdir(root_path):
+        for name in sorted(os.listdir(root_path)):
+            manifest_path = os.path.join(root_path, name, SHARD_MANIFEST)
+            if not os.path.isfile(manifest_path):
+                continue
+            with open(manifest_path, "r") as f:
+                try:
+                    manifest = json.load(f)
+                except ValueError:
+                    raise ValueError(f"{manifest_path} is not valid JSON")
+            if manifest.get("version") != MANIFEST_VERSION or "shard" not in manifest:
+                raise ValueError(f"{manifest_path} is not a shard manifest")
+            shards.append((os.path.join(root_path, name), manifest))
+    if not shards:
+        raise ValueError(f"no shard builds found in {root_path}")
+    shards.sort(key=lambda shard: shard[1]["shard"][0])
+
+    count = shards[0][1]["shard"][1]
+    settings = shards[0][1]["settings"]
+    for shard_dir_path, manifest in shards:
+        if manifest["shard"][1] != count:
+            raise ValueError(f"{shard_dir_path} is shard {manifest['shard'][0]}/{manifest['shard'][1]}, expected a shard of {count}")
+        if manifest["settings"] != settings:
+            raise ValueError(f"{shard_dir_path} was built with {manifest['settings']}, expected {settings}")
+    indexes = [manifest["shard"][0] for _, manifest in shards]
+    if indexes != list(range(count)):
+        missing = sorted(set(range(count)) - set(indexes))
+        duplicated = sorted(set(i for i in indexes if indexes.count(i) > 1))
+        raise ValueError(f"incomplete set of {count} shards: missing {missing}, duplicated {duplicated}")
+    return shards
+
+
+def merge_outputs(shards, dest_dir_path):
+    # Copies the files of each (index, site_dir_path) shard into
+    # dest_dir_path. Hardlinks would let incremental builds, which rewrite
+    # published files in place, change the shard outputs too. A path
+    # produced by more than one shard is an overlap, reported as
+    # (rel_path, first_index, index) unless the bytes match.
+    owners = {}
+    conflicts = []
+    for index, site_dir_path in shards:
+        for rel_path, _ in scan_files(site_dir_path):
+            from_path = os.path.join(site_dir_path, rel_path)
+            dest_path = os.path.join(dest_dir_path, rel_path)
+            if rel_path in owners:
+                if not filecmp.cmp(dest_path, from_path, shallow=False):
+                    conflicts.append((rel_path, owners[rel_path], index))
+                continue
+            owners[rel_path] = index
+            copy_file(from_path, dest_path)
+    return conflicts
+
+
+def merge_manifests(manifests):
+    # One manifest covering every shard's pages, with shard 0's static
+    # files. A page claimed by two shards is reported like merge_outputs.
+    merged = empty_manifest()
+    owners = {}
+    conflicts = []
+    for manifest in manifests:
+        index = manifest["shard"][0]
+        if index == 0:
+            merged["static"] = manifest["static"]
+            merged["optimized_images"] = manifest["optimized_images"]
+        for dest_path, entry in sorted(manifest["pages"].items()):
+            if dest_path in owners:
+                conflicts.append((dest_path, owners[dest_path], index))
+                continue
+            owners[dest_path] = index
+            merged["pages"][dest_path] = entry
+    return merged, conflicts
+
+
+def format_conflicts(conflicts):
+    return "\n".join(f"{path}: produced by shards {first} and {other}" for path, first, other in conflicts)
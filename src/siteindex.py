@@ -0,0 +1,80 @@
+import json
+import os
+
+from markdown_blocks import read_page_metadata
+
+
+def page_url(dest_path, dest_dir_path):
+    # Site-relative URL of a generated page, without the basepath.
+    rel_path = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if rel_path == "index.html":
+        return ""
+    if rel_path.endswith("/index.html"):
+        return rel_path[:-len("index.html")]
+    return rel_path
+
+
+def build_site_index(pages, dest_dir_path, previous=None):
+    # Built from front matter alone, so it covers every page even when the
+    # build skips rendering the unchanged ones. Entries from a previous index
+    # are reused while the source's size and mtime are unchanged.
+    previous_by_source = {}
+    for entry in previous or []:
+        previous_by_source[entry["source"]] = entry
+    index = []
+    for from_path, dest_path in pages:
+        stat = os.stat(from_path)
+        old_entry = previous_by_source.get(from_path)
+        if old_entry is not None and old_entry["size"] == stat.st_size and old_entry["mtime_ns"] == stat.st_mtime_ns and old_entry["dest"] == dest_path:
+            index.append(old_entry)
+            continue
+        metadata = read_page_metadata(from_path)
+        index.append({
+            "source": from_path,
+            "dest": dest_path,
+            "url": page_url(dest_path, dest_dir_path),
+            "title": metadata.get("title"),
+            "date": metadata.get("date"),
+            "tags": metadata.get("tags", []),
+            "draft": metadata.get("draft", False),
+            "template": metadata.get("template"),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        })
+    return index
+
+
+def published_pages(index, prefix=""):
+    # Non-draft pages under a URL prefix, newest first; undated pages last.
+    pages = [entry for entry in index if not entry["draft"] and entry["url"].startswith(prefix)]
+    pages.sort(key=lambda entry: entry["url"])
+    pages.sort(key=lambda entry: str(entry["date"] or ""), reverse=True)
+    return pages
+
+
+def pages_by_tag(index):
+    tags = {}
+    for entry in published_pages(index):
+        for tag in entry["tags"]:
+            tags.setdefault(tag, []).append(entry)
+    return tags
+
+
+def load_site_index(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        try:
+            return json.load(f)
+        except ValueError:
+            return []
+
+
+def save_site_index(path, index):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
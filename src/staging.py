@@ -0,0 +1,84 @@
+import ctypes
+import ctypes.util
+import filecmp
+import json
+import os
+import shutil
+
+from copystatic import scan_files
+
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def staging_path(dest_dir_path):
+    return os.path.normpath(dest_dir_path) + ".staging"
+
+
+def start_stage(dest_dir_path):
+    stage_dir_path = staging_path(dest_dir_path)
+    if os.path.exists(stage_dir_path):
+        shutil.rmtree(stage_dir_path)
+    os.makedirs(stage_dir_path)
+    return stage_dir_path
+
+
+def reuse_unchanged(stage_dir_path, dest_dir_path):
+    # Staged files whose bytes match the live copy are replaced by a hardlink
+    # to it, so they keep their inode and mtime after the swap. Returns the
+    # relative paths that changed and the live paths that will disappear.
+    live = {}
+    if os.path.isdir(dest_dir_path):
+        live = dict(scan_files(dest_dir_path))
+    changed = []
+    for rel_path, stat in scan_files(stage_dir_path):
+        staged_path = os.path.join(stage_dir_path, rel_path)
+        live_path = os.path.join(dest_dir_path, rel_path)
+        live_stat = live.get(rel_path)
+        if live_stat is not None and (live_stat.st_ino, live_stat.st_dev) == (stat.st_ino, stat.st_dev):
+            continue
+        if live_stat is not None and live_stat.st_size == stat.st_size and filecmp.cmp(live_path, staged_path, shallow=False):
+            tmp_path = staged_path + ".link"
+            os.link(live_path, tmp_path)
+            os.replace(tmp_path, staged_path)
+        else:
+            changed.append(rel_path)
+    staged = set(rel_path for rel_path, _ in scan_files(stage_dir_path))
+    deleted = [rel_path for rel_path in sorted(live) if rel_path not in staged]
+    return changed, deleted
+
+
+def swap_dirs(stage_dir_path, dest_dir_path):
+    # Readers see either the old tree or the new one: on Linux the two
+    # directories are exchanged with renameat2(RENAME_EXCHANGE); elsewhere
+    # the live tree is moved aside just before the staged one takes its name.
+    if not os.path.exists(dest_dir_path):
+        os.rename(stage_dir_path, dest_dir_path)
+        return
+    if not _exchange(stage_dir_path, dest_dir_path):
+        old_dir_path = os.path.normpath(dest_dir_path) + ".old"
+        if os.path.exists(old_dir_path):
+            shutil.rmtree(old_dir_path)
+        os.rename(dest_dir_path, old_dir_path)
+        os.rename(stage_dir_path, dest_dir_path)
+        stage_dir_path = old_dir_path
+    shutil.rmtree(stage_dir_path)
+
+
+def _exchange(a, b):
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        renameat2 = libc.renameat2
+    except (OSError, AttributeError):
+        return False
+    renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    result = renameat2(AT_FDCWD, os.fsencode(a), AT_FDCWD, os.fsencode(b), RENAME_EXCHANGE)
+    return result == 0
+
+
+def write_changes(path, changed, deleted):
+    dir_path = os.path.dirname(path)
+    if dir_path != "":
+        os.makedirs(dir_path, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"changed": changed, "deleted": deleted}, f, indent=1)
@@ -0,0 +1,112 @@
+import os
+import re
+
+from minify import HtmlMinifier, minify_html
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+ROOT_URL_PATTERN = re.compile(r'(href|src)="/')
+ASSET_URL_PATTERN = re.compile(r'(href|src)="(/[^"]*)"')
+
+
+def rewrite_basepath(html, basepath, assets=None):
+    # Prefixes root-relative href/src URLs with the basepath. assets maps
+    # static file URLs to their fingerprinted copies; they are swapped in
+    # here rather than when blocks are rendered, so cached block HTML does
+    # not depend on them.
+    if not assets:
+        if basepath == "/":
+            return html
+        return ROOT_URL_PATTERN.sub(lambda m: f'{m.group(1)}="{basepath}', html)
+    return ASSET_URL_PATTERN.sub(
+        lambda m: f'{m.group(1)}="{basepath}{assets.get(m.group(2), m.group(2))[1:]}"', html
+    )
+
+
+class Template():
+    def __init__(self, segments, slots, basepath="/", path=None, minify=False, assets=None):
+        if len(segments) != len(slots) + 1:
+            raise ValueError("template needs one more segment than slots")
+        self.segments = segments
+        self.slots = slots
+        self.basepath = basepath
+        self.path = path
+        self.minify = minify
+        self.assets = assets
+
+    def render(self, **values):
+        parts = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot not in values:
+                raise ValueError(f"missing template value: {slot}")
+            parts.append(rewrite_basepath(values[slot], self.basepath, self.assets))
+            parts.append(segment)
+        if self.minify:
+            return minify_html("".join(parts))
+        return "".join(parts)
+
+    def write(self, stream, **values):
+        # Values may be strings or HTML nodes; nodes are streamed fragment by
+        # fragment so the full page is never built in memory.
+        if self.minify:
+            minifier = HtmlMinifier(stream)
+            self._write(minifier, values)
+            minifier.finish()
+        else:
+            self._write(stream, values)
+
+    def _write(self, stream, values):
+        stream.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            if slot not in values:
+                raise ValueError(f"missing template value: {slot}")
+            value = values[slot]
+            if isinstance(value, str):
+                stream.write(rewrite_basepath(value, self.basepath, self.assets))
+            else:
+                for fragment in value.iter_html():
+                    stream.write(rewrite_basepath(fragment, self.basepath, self.assets))
+            stream.write(segment)
+
+    def __repr__(self):
+        return f"Template({self.path}, slots: {self.slots}, {self.basepath})"
+
+
+def compile_template(text, basepath="/", path=None, minify=False, assets=None):
+    text = rewrite_basepath(text, basepath, assets)
+    segments = []
+    slots = []
+    start = 0
+    for match in SLOT_PATTERN.finditer(text):
+        segments.append(text[start:match.start()])
+        slots.append(match.group(1))
+        start = match.end()
+    segments.append(text[start:])
+    return Template(segments, slots, basepath, path, minify, assets)
+
+
+def load_template(template_path, basepath="/", minify=False, assets=None):
+    with open(template_path, "r") as f:
+        text = f.read()
+    return compile_template(text, basepath, template_path, minify, assets)
+
+
+class TemplateSet():
+    # Compiles each template at most once per build. Pages pick a template by
+    # name (front matter "template"), resolved next to the default template.
+    def __init__(self, default_path, basepath="/", minify=False, assets=None):
+        self.default_path = default_path
+        self.basepath = basepath
+        self.minify = minify
+        self.assets = assets
+        self.templates = {}
+
+    def resolve(self, name=None):
+        if name is None:
+            return self.default_path
+        return os.path.join(os.path.dirname(self.default_path), name)
+
+    def get(self, name=None):
+        path = self.resolve(name)
+        if path not in self.templates:
+            self.templates[path] = load_template(path, self.basepath, self.minify, self.assets)
+        return self.templates[path]
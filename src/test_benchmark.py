@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+from benchmark import STAGES, compare_results, generate_corpus, run_benchmark
+from markdown_blocks import markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_corpus_is_deterministic_and_renders(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            generate_corpus(a, pages=3, blocks=12, static_files=1, static_size=16)
+            generate_corpus(b, pages=3, blocks=12, static_files=1, static_size=16)
+            rel_path = os.path.join("content", "blog", "post2", "index.md")
+            with open(os.path.join(a, rel_path)) as f:
+                markdown = f.read()
+            with open(os.path.join(b, rel_path)) as f:
+                self.assertEqual(markdown, f.read())
+            self.assertTrue(markdown.startswith("# Post 2"))
+            markdown_to_html_node(markdown).to_html()
+
+    def test_results_cover_every_stage(self):
+        with tempfile.TemporaryDirectory() as root:
+            results = run_benchmark(root, repeat=2, pages=2, blocks=6, static_files=1, static_size=16)
+        self.assertEqual(STAGES, list(results["stages"]))
+        for stage in STAGES:
+            self.assertEqual(2, len(results["stages"][stage]["runs"]))
+        self.assertEqual(len(STAGES), len(compare_results(results, results).split("\n")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from blockcache import BlockCache, load_block_cache
+from markdown_blocks import BlockType, markdown_to_html_node
+
+MARKDOWN = """
+# Title
+
+Some **bold** text with a [link](/x)
+
+- one
+- two
+
+```
+code
+```
+"""
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_cached_render_matches_uncached(self):
+        cache = BlockCache(version="test")
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        self.assertEqual(expected, markdown_to_html_node(MARKDOWN, cache).to_html())
+        self.assertEqual(4, cache.misses)
+        self.assertEqual(expected, markdown_to_html_node(MARKDOWN, cache).to_html())
+        self.assertEqual(4, cache.hits)
+
+    def test_edited_block_misses(self):
+        cache = BlockCache(version="test")
+        markdown_to_html_node(MARKDOWN, cache)
+        edited = MARKDOWN.replace("- two", "- three")
+        html = markdown_to_html_node(edited, cache).to_html()
+        self.assertIn("<li>three</li>", html)
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(5, cache.misses)
+
+    def test_key_depends_on_type_and_version(self):
+        cache = BlockCache(version="a")
+        other = BlockCache(version="b")
+        lines = ["text"]
+        self.assertNotEqual(
+            cache.key(BlockType.PARAGRAPH, lines), cache.key(BlockType.HEADING, lines)
+        )
+        self.assertNotEqual(
+            cache.key(BlockType.PARAGRAPH, lines), other.key(BlockType.PARAGRAPH, lines)
+        )
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_bytes=25, version="test")
+        cache.put("a", "x" * 9)
+        cache.put("b", "y" * 9)
+        cache.get("a")
+        cache.put("c", "z" * 9)
+        self.assertEqual(["a", "c"], list(cache.entries))
+        self.assertEqual(20, cache.size)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "blocks.json")
+            cache = load_block_cache(path)
+            markdown_to_html_node(MARKDOWN, cache)
+            cache.save(path)
+            loaded = load_block_cache(path)
+            self.assertEqual(list(cache.entries.items()), list(loaded.entries.items()))
+            markdown_to_html_node(MARKDOWN, loaded)
+            self.assertEqual(0, loaded.misses)
+
+    def test_take_added(self):
+        cache = BlockCache(version="test")
+        cache.record_added = True
+        cache.put("a", "x")
+        self.assertEqual({"a": "x"}, cache.take_added())
+        self.assertEqual({}, cache.take_added())
+
+    def test_added_only_recorded_for_workers(self):
+        cache = BlockCache(max_bytes=25, version="test")
+        for key in ("a", "b", "c", "d"):
+            cache.put(key, "x" * 10)
+        self.assertEqual({}, cache.added)
+        self.assertEqual(["c", "d"], list(cache.entries))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import compress_file, compress_outputs, is_compressible, remove_compressed
+
+PAGE = "<p>" + "hello world " * 200 + "</p>"
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.docs, "index.html"), PAGE)
+        write(os.path.join(self.docs, "blog", "post.html"), PAGE)
+        write(os.path.join(self.docs, "small.css"), "body {}")
+        write(os.path.join(self.docs, "images", "a.png"), "x" * 4096)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_is_compressible(self):
+        self.assertTrue(is_compressible("index.HTML", 2048))
+        self.assertFalse(is_compressible("index.html", 10))
+        self.assertFalse(is_compressible("images/a.png", 4096))
+
+    def test_compress_file_is_reproducible(self):
+        path = os.path.join(self.docs, "index.html")
+        compress_file(path)
+        with open(path + ".gz", "rb") as f:
+            first = f.read()
+        compress_file(path)
+        with open(path + ".gz", "rb") as f:
+            self.assertEqual(f.read(), first)
+        self.assertEqual(gzip.decompress(first).decode(), PAGE)
+
+    def test_compress_outputs(self):
+        compressed, removed = compress_outputs(self.docs, jobs=2)
+        self.assertEqual(sorted(compressed), ["blog/post.html", "index.html"])
+        self.assertEqual(removed, [])
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "small.css.gz")))
+
+    def test_skips_unchanged(self):
+        state = {}
+        compress_outputs(self.docs, state=state)
+        self.assertEqual(["blog/post.html", "index.html"], sorted(state))
+        compressed, _ = compress_outputs(self.docs, state=state)
+        self.assertEqual(compressed, [])
+        compressed, _ = compress_outputs(self.docs, level=1, state=state)
+        self.assertEqual(sorted(compressed), ["blog/post.html", "index.html"])
+        # Without a record of what the .gz files were made from, they are
+        # not trusted.
+        compressed, _ = compress_outputs(self.docs)
+        self.assertEqual(sorted(compressed), ["blog/post.html", "index.html"])
+
+    def test_recompresses_source_restored_with_older_mtime(self):
+        state = {}
+        compress_outputs(self.docs, state=state)
+        path = os.path.join(self.docs, "index.html")
+        stat = os.stat(path)
+        write(path, PAGE + "restored")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+        compressed, _ = compress_outputs(self.docs, state=state)
+        self.assertEqual(compressed, ["index.html"])
+        with open(path + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()).decode(), PAGE + "restored")
+
+    def test_removes_stale(self):
+        compress_outputs(self.docs)
+        os.remove(os.path.join(self.docs, "blog", "post.html"))
+        write(os.path.join(self.docs, "index.html"), "tiny")
+        compressed, removed = compress_outputs(self.docs)
+        self.assertEqual(compressed, [])
+        self.assertEqual(sorted(removed), ["blog/post.html.gz", "index.html.gz"])
+
+    def test_remove_compressed(self):
+        state = {}
+        compress_outputs(self.docs, state=state)
+        os.remove(os.path.join(self.docs, "blog", "post.html"))
+        self.assertEqual(["blog/post.html.gz", "index.html.gz"], remove_compressed(self.docs, state))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_reuses_previous_tree(self):
+        state = {}
+        compress_outputs(self.docs, state=state)
+        stage = os.path.join(self.tmp.name, "docs.staging")
+        write(os.path.join(stage, "index.html"), PAGE)
+        write(os.path.join(stage, "blog", "post.html"), PAGE + "changed")
+        compressed, _ = compress_outputs(stage, previous_dir_path=self.docs, state=state)
+        self.assertEqual(compressed, ["blog/post.html"])
+        self.assertEqual(
+            os.stat(os.path.join(stage, "index.html.gz")).st_ino,
+            os.stat(os.path.join(self.docs, "index.html.gz")).st_ino,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
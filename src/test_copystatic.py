@@ -0,0 +1,133 @@
+import os
+import tempfile
+import unittest
+
+from copystatic import (
+    asset_map,
+    copy_files_recursive,
+    hash_assets,
+    sync_static,
+    sync_static_paths,
+    write_fingerprinted,
+)
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime_ns=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime_ns is not None:
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_copy_files_recursive(self):
+        copy_files_recursive(self.static, self.public)
+        self.assertEqual("png", self.read(os.path.join(self.public, "images", "a.png")))
+
+    def test_first_sync_copies_everything(self):
+        state, changed, removed = sync_static(self.static, self.public, {})
+        self.assertEqual(["images/a.png", "index.css"], changed)
+        self.assertEqual([], removed)
+        self.assertEqual(["images/a.png", "index.css"], sorted(state))
+        self.assertEqual("body {}", self.read(os.path.join(self.public, "index.css")))
+
+    def test_unchanged_sync_copies_nothing(self):
+        state, _, _ = sync_static(self.static, self.public, {})
+        state, changed, removed = sync_static(self.static, self.public, state)
+        self.assertEqual([], changed)
+        self.assertEqual([], removed)
+
+    def test_changed_file_is_copied(self):
+        state, _, _ = sync_static(self.static, self.public, {})
+        self.write(os.path.join(self.static, "index.css"), "body { color: red }")
+        state, changed, _ = sync_static(self.static, self.public, state)
+        self.assertEqual(["index.css"], changed)
+        self.assertEqual("body { color: red }", self.read(os.path.join(self.public, "index.css")))
+
+    def test_missing_destination_is_copied(self):
+        state, _, _ = sync_static(self.static, self.public, {})
+        os.remove(os.path.join(self.public, "index.css"))
+        _, changed, _ = sync_static(self.static, self.public, state)
+        self.assertEqual(["index.css"], changed)
+
+    def test_hash_skips_touched_file(self):
+        state, _, _ = sync_static(self.static, self.public, {}, use_hash=True)
+        self.write(os.path.join(self.static, "index.css"), "body {}", mtime_ns=10**9)
+        state, changed, _ = sync_static(self.static, self.public, state, use_hash=True)
+        self.assertEqual([], changed)
+        self.assertEqual(10**9, state["index.css"]["mtime_ns"])
+
+    def test_stale_files_removed_but_pages_kept(self):
+        state, _, _ = sync_static(self.static, self.public, {})
+        self.write(os.path.join(self.public, "index.html"), "page")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        state, _, removed = sync_static(self.static, self.public, state)
+        self.assertEqual(["images/a.png"], removed)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_sync_static_paths(self):
+        state, _, _ = sync_static(self.static, self.public, {})
+        self.write(os.path.join(self.static, "index.css"), "p {}")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        changed, removed = sync_static_paths(
+            ["index.css", "images/a.png"], self.static, self.public, state
+        )
+        self.assertEqual(["index.css"], changed)
+        self.assertEqual(["images/a.png"], removed)
+        self.assertEqual(["index.css"], sorted(state))
+        self.assertEqual("p {}", self.read(os.path.join(self.public, "index.css")))
+
+    def test_link_shares_inode(self):
+        sync_static(self.static, self.public, {}, link=True)
+        self.assertEqual(
+            os.stat(os.path.join(self.static, "index.css")).st_ino,
+            os.stat(os.path.join(self.public, "index.css")).st_ino,
+        )
+
+    def test_asset_map(self):
+        state = hash_assets(self.static, {})
+        assets = asset_map(state)
+        self.assertEqual(["/images/a.png", "/index.css"], sorted(assets))
+        self.assertEqual("/index." + state["index.css"]["hash"][:8] + ".css", assets["/index.css"])
+
+    def test_unchanged_files_are_not_rehashed(self):
+        state = hash_assets(self.static, {})
+        state["index.css"]["hash"] = "cached"
+        self.assertEqual("cached", hash_assets(self.static, state)["index.css"]["hash"])
+        self.write(os.path.join(self.static, "index.css"), "p {}")
+        self.assertNotEqual("cached", hash_assets(self.static, state)["index.css"]["hash"])
+
+    def test_write_fingerprinted_replaces_stale_copies(self):
+        sync_static(self.static, self.public, {})
+        state = hash_assets(self.static, {})
+        written, removed = write_fingerprinted(state, self.public)
+        self.assertEqual(2, len(written))
+        old_path = os.path.join(self.public, asset_map(state)["/index.css"][1:])
+        self.assertEqual("body {}", self.read(old_path))
+
+        self.write(os.path.join(self.static, "index.css"), "p {}")
+        sync_static(self.static, self.public, {})
+        new_state = hash_assets(self.static, state)
+        written, removed = write_fingerprinted(new_state, self.public, state)
+        self.assertEqual([asset_map(new_state)["/index.css"][1:]], written)
+        self.assertEqual([asset_map(state)["/index.css"][1:]], removed)
+        self.assertFalse(os.path.exists(old_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import xml.dom.minidom
+
+from feeds import feed_xml, sitemap_xml, updated, write_if_changed
+
+
+def entry(url, title, date=None, tags=(), draft=False, mtime_ns=0):
+    return {
+        "source": f"./content/{url}index.md",
+        "dest": f"docs/{url}index.html",
+        "url": url,
+        "title": title,
+        "date": date,
+        "tags": list(tags),
+        "draft": draft,
+        "template": None,
+        "size": 1,
+        "mtime_ns": mtime_ns,
+    }
+
+
+INDEX = [
+    entry("", "Fan Club"),
+    entry("blog/old/", "Old & Busted", date="2023-05-01", tags=["tom"]),
+    entry("blog/new/", "New", date="2024-01-02"),
+    entry("blog/draft/", "Draft", date="2025-01-01", draft=True),
+]
+BASE_URL = "https://example.com/site/"
+
+
+class TestFeeds(unittest.TestCase):
+    def test_updated(self):
+        self.assertEqual("2024-01-02T00:00:00Z", updated(entry("a/", "A", date="2024-01-02")))
+        self.assertEqual("2024-01-02T10:00:00+02:00", updated(entry("a/", "A", date="2024-01-02T10:00:00+02:00")))
+        self.assertEqual("1970-01-01T00:00:01Z", updated(entry("a/", "A", mtime_ns=1000000000)))
+
+    def test_sitemap(self):
+        sitemap = sitemap_xml(INDEX, BASE_URL)
+        xml.dom.minidom.parseString(sitemap)
+        self.assertIn("<url><loc>https://example.com/site/blog/new/</loc><lastmod>2024-01-02</lastmod></url>", sitemap)
+        self.assertNotIn("draft", sitemap)
+        self.assertEqual(3, sitemap.count("<url>"))
+
+    def test_feed(self):
+        feed, cache, rebuilt = feed_xml(INDEX, BASE_URL)
+        dom = xml.dom.minidom.parseString(feed)
+        titles = [node.firstChild.data for node in dom.getElementsByTagName("entry")[0].getElementsByTagName("title")]
+        self.assertEqual(["New"], titles)
+        self.assertEqual(2, len(dom.getElementsByTagName("entry")))
+        self.assertIn("<title>Old &amp; Busted</title>", feed)
+        self.assertIn('<category term="tom"/>', feed)
+        self.assertIn("<updated>2024-01-02T00:00:00Z</updated>\n  <author>", feed)
+        self.assertEqual(["./content/blog/new/index.md", "./content/blog/old/index.md"], rebuilt)
+        self.assertEqual(sorted(rebuilt), sorted(cache))
+
+    def test_feed_cache(self):
+        feed, cache, _ = feed_xml(INDEX, BASE_URL)
+        again, cache, rebuilt = feed_xml(INDEX, BASE_URL, cache)
+        self.assertEqual(feed, again)
+        self.assertEqual([], rebuilt)
+        index = INDEX[:2] + [entry("blog/new/", "Newer", date="2024-01-02")]
+        changed, _, rebuilt = feed_xml(index, BASE_URL, cache)
+        self.assertEqual(["./content/blog/new/index.md"], rebuilt)
+        self.assertIn("<title>Newer</title>", changed)
+
+    def test_write_if_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "feed.xml")
+            self.assertTrue(write_if_changed(path, "a"))
+            self.assertFalse(write_if_changed(path, "a"))
+            self.assertTrue(write_if_changed(path, "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
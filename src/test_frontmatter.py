@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+from frontmatter import parse_front_matter, read_front_matter
+from markdown_blocks import markdown_to_document, markdown_to_html_node, read_page_metadata
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parse_fields(self):
+        metadata = parse_front_matter([
+            "title: \"Tom: a mistake\"",
+            "date: 2024-05-01",
+            "tags: [tolkien, 'essays']",
+            "draft: false",
+            "# a comment",
+            "template: blog.html",
+        ])
+        self.assertEqual(
+            {
+                "title": "Tom: a mistake",
+                "date": "2024-05-01",
+                "tags": ["tolkien", "essays"],
+                "draft": False,
+                "template": "blog.html",
+            },
+            metadata,
+        )
+
+    def test_parse_block_list_and_comma_tags(self):
+        self.assertEqual(["a", "b"], parse_front_matter(["tags:", "  - a", "  - b"])["tags"])
+        self.assertEqual(["a", "b"], parse_front_matter(["tags: a, b"])["tags"])
+
+    def test_title_and_template_must_be_strings(self):
+        self.assertEqual({}, parse_front_matter(["title:", "template:"]))
+        for lines in (["title: [a, b]"], ["title: true"], ["template: ''"], ["title:", "  - a"]):
+            with self.assertRaises(ValueError):
+                parse_front_matter(lines)
+
+    def test_empty_title_falls_back_to_heading(self):
+        _, metadata = markdown_to_document("---\ntitle:\n---\n# Real title")
+        self.assertEqual("Real title", metadata["title"])
+
+    def test_invalid_line(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["not a pair"])
+
+    def test_document_with_front_matter(self):
+        md = "---\ntitle: From front matter\ntags: [x]\n---\n# Heading\n\nbody"
+        node, metadata = markdown_to_document(md)
+        self.assertEqual("From front matter", metadata["title"])
+        self.assertEqual(["x"], metadata["tags"])
+        self.assertEqual("<div><h1>Heading</h1><p>body</p></div>", node.to_html())
+
+    def test_document_title_from_heading(self):
+        md = "intro\n\n# The Title\n\n# Second"
+        _, metadata = markdown_to_document(md)
+        self.assertEqual("The Title", metadata["title"])
+
+    def test_document_without_title(self):
+        with self.assertRaises(ValueError):
+            markdown_to_document("no title here")
+
+    def test_unclosed_front_matter_is_content(self):
+        md = "---\ntitle: x\n\n# Real"
+        node, metadata = markdown_to_document(md)
+        self.assertEqual("Real", metadata["title"])
+        self.assertEqual(markdown_to_html_node(md).to_html(), node.to_html())
+
+    def read_metadata(self, text):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, "w") as f:
+                f.write(text)
+            return read_front_matter(path), read_page_metadata(path)
+
+    def test_read_page_metadata(self):
+        front_matter, metadata = self.read_metadata("---\ndraft: true\n---\n\n# Title\n\n" + "text\n" * 1000)
+        self.assertEqual({"draft": True}, front_matter)
+        self.assertEqual({"draft": True, "title": "Title"}, metadata)
+
+    def test_read_page_metadata_skips_fenced_headings(self):
+        md = "Intro\n\n```\n# shell comment\n```\n\n# Real Title"
+        _, metadata = self.read_metadata(md)
+        self.assertEqual("Real Title", metadata["title"])
+        self.assertEqual(markdown_to_document(md)[1]["title"], metadata["title"])
+
+
+if __name__ == "__main__":
+    unittest.main()
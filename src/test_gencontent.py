@@ -1,6 +1,19 @@
+import os
+import tempfile
 import unittest
 
-from gencontent import extract_title
+from gencontent import (
+    extract_title,
+    find_pages,
+    generate_page,
+    generate_page_streaming,
+    generate_pages,
+    generate_pages_incremental,
+    update_pages,
+)
+from blockcache import BlockCache
+from manifest import empty_manifest
+from template import TemplateSet
 
 
 class TestExtractTitle(unittest.TestCase):
@@ -46,5 +59,255 @@ no title
             pass
 
 
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "post"))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nbody")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def build(self, manifest, basepath="/"):
+        return generate_pages_incremental(
+            self.content, self.template, self.public, basepath, manifest
+        )
+
+    def test_find_pages(self):
+        pages = find_pages(self.content, self.public)
+        self.assertEqual(
+            [
+                (
+                    os.path.join(self.content, "blog", "post", "index.md"),
+                    os.path.join(self.public, "blog", "post", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.public, "index.html"),
+                ),
+            ],
+            pages,
+        )
+
+    def test_second_build_renders_nothing(self):
+        manifest = empty_manifest()
+        rendered, removed = self.build(manifest)
+        self.assertEqual(2, len(rendered))
+        rendered, removed = self.build(manifest)
+        self.assertEqual([], rendered)
+        self.assertEqual([], removed)
+
+    def test_only_changed_page_is_rendered(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nchanged")
+        rendered, _ = self.build(manifest)
+        self.assertEqual([os.path.join(self.public, "index.html")], rendered)
+
+    def test_template_and_basepath_changes_render_all(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        rendered, _ = self.build(manifest, basepath="/site/")
+        self.assertEqual(2, len(rendered))
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        rendered, _ = self.build(manifest, basepath="/site/")
+        self.assertEqual(2, len(rendered))
+
+    def test_links_recorded_in_manifest(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        home = os.path.join(self.public, "index.html")
+        self.assertEqual([(3, "/blog/post")], manifest["pages"][home]["links"])
+        del manifest["pages"][home]["links"]
+        rendered, _ = self.build(manifest)
+        self.assertEqual([home], rendered)
+
+    def test_search_terms_recorded_in_manifest(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        home = os.path.join(self.public, "index.html")
+        self.assertNotIn("terms", manifest["pages"][home])
+        rendered, _ = generate_pages_incremental(
+            self.content, self.template, self.public, "/", manifest, cache=BlockCache(), search=True
+        )
+        self.assertEqual(2, len(rendered))
+        self.assertEqual(["home", "post"], manifest["pages"][home]["terms"])
+
+    def test_minify_change_renders_all(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        rendered, _ = generate_pages_incremental(
+            self.content, self.template, self.public, "/", manifest, minify=True
+        )
+        self.assertEqual(2, len(rendered))
+
+    def test_modified_output_is_rendered_again(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        self.write(os.path.join(self.public, "index.html"), "tampered")
+        rendered, _ = self.build(manifest)
+        self.assertEqual([os.path.join(self.public, "index.html")], rendered)
+
+    def test_removed_source_deletes_output(self):
+        manifest = empty_manifest()
+        self.build(manifest)
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        os.rmdir(os.path.join(self.content, "blog", "post"))
+        rendered, removed = self.build(manifest)
+        self.assertEqual([], rendered)
+        self.assertEqual([os.path.join(self.public, "blog", "post", "index.html")], removed)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+class TestFrontMatterPages(SiteTestCase):
+    def test_front_matter_title_and_template(self):
+        self.write(
+            os.path.join(os.path.dirname(self.template), "post.html"),
+            "<h1>{{ Title }}</h1>{{ Content }}",
+        )
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "---\ntitle: Front\ntemplate: post.html\n---\n# Heading",
+        )
+        pages = find_pages(self.content, self.public)
+        generate_pages(pages, self.template, "/")
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertEqual("<h1>Front</h1><div><h1>Heading</h1></div>", f.read())
+
+    def test_page_template_edit_rerenders_page(self):
+        post_template = os.path.join(os.path.dirname(self.template), "post.html")
+        self.write(post_template, "{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "---\ntemplate: post.html\n---\n# Home")
+        manifest = empty_manifest()
+        generate_pages_incremental(self.content, self.template, self.public, "/", manifest)
+        self.write(post_template, "<main>{{ Content }}</main>")
+        rendered, _ = generate_pages_incremental(self.content, self.template, self.public, "/", manifest)
+        self.assertEqual([os.path.join(self.public, "index.html")], rendered)
+
+
+class TestUpdatePages(SiteTestCase):
+    def test_update_single_page(self):
+        manifest = empty_manifest()
+        generate_pages_incremental(self.content, self.template, self.public, "/", manifest)
+        path = os.path.join(self.content, "index.md")
+        self.write(path, "# Home\n\nedited")
+        rendered, removed = update_pages(
+            [os.path.normpath(path)], self.content, self.template, self.public, "/", manifest
+        )
+        self.assertEqual([os.path.join(self.public, "index.html")], rendered)
+        with open(rendered[0]) as f:
+            self.assertIn("edited", f.read())
+        rendered, _ = generate_pages_incremental(
+            self.content, self.template, self.public, "/", manifest
+        )
+        self.assertEqual([], rendered)
+
+    def test_update_deleted_page(self):
+        manifest = empty_manifest()
+        generate_pages_incremental(self.content, self.template, self.public, "/", manifest)
+        path = os.path.join(self.content, "blog", "post", "index.md")
+        os.remove(path)
+        rendered, removed = update_pages(
+            [path], self.content, self.template, self.public, "/", manifest
+        )
+        self.assertEqual([], rendered)
+        self.assertEqual([os.path.join(self.public, "blog", "post", "index.html")], removed)
+        self.assertNotIn(removed[0], manifest["pages"])
+
+
+class TestParallelBuild(SiteTestCase):
+    def read_outputs(self):
+        outputs = {}
+        for _, dest_path in find_pages(self.content, self.public):
+            with open(dest_path) as f:
+                outputs[dest_path] = f.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        pages = find_pages(self.content, self.public)
+        generate_pages(pages, self.template, "/site/", jobs=1)
+        serial = self.read_outputs()
+        generate_pages(pages, self.template, "/site/", jobs=2)
+        self.assertEqual(serial, self.read_outputs())
+
+    def test_parallel_cache_collects_worker_entries(self):
+        pages = find_pages(self.content, self.public)
+        generate_pages(pages, self.template, "/site/")
+        plain = self.read_outputs()
+        cache = BlockCache(version="test")
+        generate_pages(pages, self.template, "/site/", jobs=2, cache=cache)
+        self.assertEqual(plain, self.read_outputs())
+        self.assertEqual(4, len(cache))
+        generate_pages(pages, self.template, "/site/", cache=cache)
+        self.assertEqual(plain, self.read_outputs())
+        self.assertEqual(4, cache.hits)
+
+    def test_profiled_build_matches_and_reports(self):
+        pages = find_pages(self.content, self.public)
+        generate_pages(pages, self.template, "/site/")
+        plain = self.read_outputs()
+        stats = []
+        generate_pages(pages, self.template, "/site/", jobs=2, stats=stats)
+        self.assertEqual(plain, self.read_outputs())
+        self.assertEqual([from_path for from_path, _ in pages], [page["source"] for page in stats])
+        self.assertEqual(
+            ["read", "block_parse", "inline_parse", "serialize", "template", "write"],
+            list(stats[0]["timings"]),
+        )
+        self.assertEqual(len(plain[pages[0][1]].encode()), stats[0]["output_bytes"])
+
+    def test_parallel_raises_first_error_in_order(self):
+        self.write(os.path.join(self.content, "index.md"), "no title")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "**open")
+        pages = find_pages(self.content, self.public)
+        with self.assertRaisesRegex(ValueError, "formatted section not closed"):
+            generate_pages(pages, self.template, "/", jobs=2)
+
+
+class TestStreamingPages(SiteTestCase):
+    def render(self, render_page, source, cache=None):
+        path = os.path.join(self.content, "big.md")
+        dest_path = os.path.join(self.public, "big.html")
+        self.write(path, source)
+        render_page(path, TemplateSet(self.template, "/site/"), dest_path, cache)
+        with open(dest_path) as f:
+            return f.read()
+
+    def test_streaming_matches_generate_page(self):
+        source = "---\ntags: [a]\n---\nIntro **text**\n\n# Big\n\n" + "".join(
+            f"Paragraph {i} [link](/page/{i})\n\n- item _{i}_\n\n```\ncode\n\n```\n\n" for i in range(50)
+        )
+        self.assertEqual(
+            self.render(generate_page, source),
+            self.render(generate_page_streaming, source),
+        )
+        cache = BlockCache()
+        self.render(generate_page_streaming, source, cache)
+        self.assertEqual(self.render(generate_page, source), self.render(generate_page_streaming, source, cache))
+        self.assertGreater(cache.hits, 0)
+
+    def test_streaming_front_matter_title(self):
+        html = self.render(generate_page_streaming, "---\ntitle: Front\n---\n# Heading")
+        self.assertEqual("<title>Front</title><div><h1>Heading</h1></div>", html)
+
+    def test_streaming_requires_title(self):
+        with self.assertRaisesRegex(ValueError, "no title found"):
+            self.render(generate_page_streaming, "```\n# not a title\n```\n\ntext")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "big.html")))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -1,3 +1,4 @@
+import io
 import unittest
 from textnode import TextNode, TextType, text_node_to_html_node
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -122,5 +123,38 @@ class TestHTMLNode(unittest.TestCase):
         self.assertIn('id="x"', html)
         self.assertTrue(html.endswith("</div>"))
 
+    def test_iter_html_fragments(self):
+        node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(
+            ["<p>", "<b>bold</b>", " text", "</p>"],
+            list(node.iter_html()),
+        )
+
+    def test_write_html_matches_to_html(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("a", "link", {"href": "/x"})])],
+            {"class": "box"},
+        )
+        stream = io.StringIO()
+        node.write_html(stream)
+        self.assertEqual(node.to_html(), stream.getvalue())
+
+    def test_trusted_parent_matches_validated(self):
+        children = [LeafNode("b", "x")]
+        self.assertEqual(
+            ParentNode("p", children, {"class": "c"}).to_html(),
+            ParentNode.trusted("p", children, {"class": "c"}).to_html(),
+        )
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [])):
+            with self.subTest(node=node):
+                self.assertFalse(hasattr(node, "__dict__"))
+
+    def test_iter_html_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            list(HTMLNode("p", "test").iter_html())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
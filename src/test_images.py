@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+import zlib
+
+from images import is_png, optimize_images, optimize_png, read_chunks, write_chunk, PNG_SIGNATURE
+
+
+def make_png(width=32, height=32, extra=()):
+    ihdr = width.to_bytes(4, "big") + height.to_bytes(4, "big") + bytes([8, 2, 0, 0, 0])
+    rows = b"".join(b"\x00" + bytes((x * 8 + y) % 256 for x in range(width * 3)) for y in range(height))
+    # Level 1 leaves room for recompression to win.
+    idat = zlib.compress(rows, 1)
+    chunks = [write_chunk(b"IHDR", ihdr)]
+    chunks.extend(write_chunk(chunk_type, body) for chunk_type, body in extra)
+    chunks.append(write_chunk(b"IDAT", idat[:len(idat) // 2]))
+    chunks.append(write_chunk(b"IDAT", idat[len(idat) // 2:]))
+    chunks.append(write_chunk(b"IEND", b""))
+    return PNG_SIGNATURE + b"".join(chunks)
+
+
+def pixels(data):
+    return zlib.decompress(b"".join(body for chunk_type, body in read_chunks(data) if chunk_type == b"IDAT"))
+
+
+class TestOptimizePng(unittest.TestCase):
+    def test_lossless_and_smaller(self):
+        data = make_png()
+        optimized = optimize_png(data)
+        self.assertLess(len(optimized), len(data))
+        self.assertEqual(pixels(optimized), pixels(data))
+
+    def test_strips_ancillary_chunks(self):
+        data = make_png(extra=[(b"sRGB", b"\x00"), (b"tEXt", b"Comment\x00hello"), (b"tIME", b"\x07\xe8\x01\x01\x00\x00\x00")])
+        chunk_types = [chunk_type for chunk_type, _ in read_chunks(optimize_png(data))]
+        self.assertEqual(chunk_types, [b"IHDR", b"sRGB", b"IDAT", b"IEND"])
+
+    def test_keeps_original_when_not_smaller(self):
+        data = optimize_png(make_png())
+        self.assertIs(optimize_png(data), data)
+
+    def test_animated_png_left_alone(self):
+        data = make_png(extra=[(b"acTL", bytes(8))])
+        self.assertIs(optimize_png(data), data)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            optimize_png(b"GIF89a")
+        data = bytearray(make_png())
+        data[-5] ^= 0xFF
+        with self.assertRaises(ValueError):
+            optimize_png(bytes(data))
+
+    def test_is_png(self):
+        self.assertTrue(is_png("images/tom.PNG"))
+        self.assertFalse(is_png("index.css"))
+
+
+class TestOptimizeImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.cache = os.path.join(self.tmp.name, "cache")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.docs, "images"))
+        self.data = make_png()
+        for name in ("a.png", "b.png"):
+            with open(os.path.join(self.static, "images", name), "wb") as f:
+                f.write(self.data)
+            os.link(os.path.join(self.static, "images", name), os.path.join(self.docs, "images", name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_optimize_images(self):
+        results = optimize_images(["images/a.png", "images/b.png"], self.static, self.docs, self.cache)
+        self.assertEqual([rel_path for rel_path, _, _ in results], ["images/a.png", "images/b.png"])
+        self.assertLess(results[0][2], results[0][1])
+        # Identical images share one cache entry.
+        self.assertEqual(len(os.listdir(self.cache)), 1)
+        with open(os.path.join(self.docs, "images", "a.png"), "rb") as f:
+            self.assertEqual(pixels(f.read()), pixels(self.data))
+        # The hardlinked source is left alone.
+        with open(os.path.join(self.static, "images", "a.png"), "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_cache_reused(self):
+        optimize_images(["images/a.png"], self.static, self.docs, self.cache)
+        cache_path = os.path.join(self.cache, os.listdir(self.cache)[0])
+        mtime = os.stat(cache_path).st_mtime_ns
+        optimize_images(["images/a.png", "images/b.png"], self.static, self.docs, self.cache, jobs=2)
+        self.assertEqual(os.stat(cache_path).st_mtime_ns, mtime)
+
+    def test_invalid_image_copied_as_is(self):
+        with open(os.path.join(self.static, "images", "bad.png"), "wb") as f:
+            f.write(b"not a png")
+        with self.assertLogs("images", level="WARNING"):
+            results = optimize_images(["images/bad.png"], self.static, self.docs, self.cache)
+        self.assertEqual(results, [("images/bad.png", 9, 9)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+from linkcheck import build_path_index, check_links, is_served, resolve_url, template_links
+
+
+class TestResolveUrl(unittest.TestCase):
+    def test_root_relative(self):
+        self.assertEqual("blog/tom", resolve_url("/blog/tom", "contact/"))
+        self.assertEqual("", resolve_url("/"))
+        self.assertEqual("a b", resolve_url("/a%20b?x=1#top"))
+
+    def test_relative(self):
+        self.assertEqual("blog/tom/x.png", resolve_url("x.png", "blog/tom/"))
+        self.assertEqual("blog/majesty/", resolve_url("../majesty/", "blog/tom/"))
+        self.assertEqual("x.html", resolve_url("x.html", "about.html"))
+
+    def test_external_and_fragments(self):
+        for url in ("https://example.com/a", "//cdn.example.com/a.js", "mailto:me@example.com", "#top", "?q=1"):
+            self.assertIsNone(resolve_url(url))
+
+
+class TestIsServed(unittest.TestCase):
+    def test_lookup(self):
+        index = {"index.html", "blog/tom/index.html", "about.html", "images/a.png"}
+        for path in ("", "blog/tom", "blog/tom/", "about", "about.html", "images/a.png"):
+            self.assertTrue(is_served(path, index), path)
+        for path in ("blog/", "blog/gone", "images/b.png", "about/"):
+            self.assertFalse(is_served(path, index), path)
+
+
+class TestCheckLinks(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.static, "images"))
+        with open(os.path.join(self.static, "images", "a.png"), "wb") as f:
+            f.write(b"png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_check_links(self):
+        home = os.path.join(self.docs, "index.html")
+        post = os.path.join(self.docs, "blog", "tom", "index.html")
+        index = build_path_index([home, post], self.docs, self.static)
+        self.assertEqual({"index.html", "blog/tom/index.html", "images/a.png"}, index)
+        pages = [
+            ("content/index.md", home, [(3, "/blog/tom"), (4, "/blog/gone"), (5, "https://example.com")]),
+            ("content/blog/tom/index.md", post, [(1, "/images/a.png"), (2, "b.png"), (7, "../tom/")]),
+        ]
+        self.assertEqual(
+            [("content/blog/tom/index.md", 2, "b.png"), ("content/index.md", 4, "/blog/gone")],
+            check_links(pages, index, self.docs),
+        )
+
+    def test_index_includes_published_outputs(self):
+        os.makedirs(os.path.join(self.docs, "search"))
+        for name in ("feed.xml", os.path.join("search", "pages.json")):
+            with open(os.path.join(self.docs, name), "w") as f:
+                f.write("x")
+        index = build_path_index([], self.docs, self.static)
+        self.assertEqual({"feed.xml", "search/pages.json", "images/a.png"}, index)
+        self.assertEqual([], check_links([("template.html", os.path.join(self.docs, "index.html"), [(7, "/feed.xml")])], index, self.docs))
+
+    def test_template_links(self):
+        path = os.path.join(self.tmp.name, "template.html")
+        with open(path, "w") as f:
+            f.write('<html>\n<link href="/index.css" rel="stylesheet" />\n<img src="/a.png" /><a href="https://x.y">x</a>\n')
+        self.assertEqual([(2, "/index.css"), (3, "/a.png"), (3, "https://x.y")], template_links(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
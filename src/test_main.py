@@ -0,0 +1,305 @@
+import contextlib
+import filecmp
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import main
+from copystatic import load_asset_state, scan_files
+from manifest import load_manifest
+from scheduler import run_stages
+from test_images import make_png
+
+TEMPLATE = """<html>
+<head><title>{{ Title }}</title><link href="/index.css" rel="stylesheet"></head>
+<body>{{ Content }}</body>
+</html>
+"""
+
+
+class SiteTestCase(unittest.TestCase):
+    # Runs main's builds in a throwaway site: main works on paths relative
+    # to the current directory.
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.write("template.html", TEMPLATE)
+        self.write("static/index.css", "body { color: black }\n" * 100)
+        os.makedirs("static/images")
+        with open("static/images/a.png", "wb") as f:
+            f.write(make_png(8, 8))
+        self.write("content/index.md", "# Home\n\n[Post](/blog/post) ![a](/images/a.png)")
+        self.write("content/blog/post/index.md", "# Post\n\nSome text about posts.")
+        self.write("content/contact/index.md", "# Contact\n\nWrite to us.")
+
+    def tearDown(self):
+        os.chdir(self.old_cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def build(self, *args):
+        options = main.parse_args(list(args))
+        self.output = io.StringIO()
+        with contextlib.redirect_stdout(self.output):
+            if options.incremental:
+                return main.build_incremental(main.normalize_basepath(options.basepath), options)
+            return main.build_full(main.normalize_basepath(options.basepath), options)
+
+
+class TestFullBuild(SiteTestCase):
+    def test_writes_manifest_for_incremental_builds(self):
+        self.build()
+        manifest = load_manifest(main.manifest_path)
+        self.assertEqual(
+            ["docs/blog/post/index.html", "docs/contact/index.html", "docs/index.html"],
+            sorted(manifest["pages"]),
+        )
+        self.assertEqual(["images/a.png", "index.css"], sorted(manifest["static"]))
+
+        os.remove("content/contact/index.md")
+        os.remove("static/images/a.png")
+        manifest = self.build("--incremental")
+        self.assertIn("Rendered 0 page(s), removed 1 stale page(s)", self.output.getvalue())
+        self.assertNotIn("docs/contact/index.html", manifest["pages"])
+        self.assertFalse(os.path.exists("docs/contact/index.html"))
+        self.assertFalse(os.path.exists("docs/images/a.png"))
+        self.assertTrue(os.path.exists("docs/blog/post/index.html"))
+
+    def test_gzip_state_follows_published_tree(self):
+        self.build("--gzip", "--gzip-min-size", "1")
+        self.build("--incremental", "--gzip", "--gzip-min-size", "1")
+        self.assertIn("Compressed 0 file(s)", self.output.getvalue())
+        self.write("content/contact/index.md", "# Contact\n\nMoved.")
+        self.build("--incremental", "--gzip", "--gzip-min-size", "1")
+        self.assertIn("Compressed 1 file(s)", self.output.getvalue())
+
+    def test_dropping_gzip_removes_compressed_files(self):
+        self.build("--fingerprint", "--gzip", "--gzip-min-size", "1")
+        self.build("--incremental", "--fingerprint", "--gzip", "--gzip-min-size", "1")
+        self.assertTrue(os.path.exists("docs/index.html.gz"))
+        self.build("--incremental", "--fingerprint")
+        self.assertEqual([], [rel_path for rel_path, _ in scan_files("docs") if rel_path.endswith(".gz")])
+        self.assertEqual({}, load_asset_state(main.gzip_state_path))
+
+        self.build("--gzip", "--gzip-min-size", "1")
+        self.build()
+        self.assertEqual({}, load_asset_state(main.gzip_state_path))
+        self.build("--incremental", "--gzip", "--gzip-min-size", "1")
+        self.assertIn("Compressed 4 file(s)", self.output.getvalue())
+
+    def test_main_indexes_full_build_once(self):
+        # static/ and content/ both hold blog/, which the static and pages
+        # stages create in the staging tree side by side.
+        self.write("static/blog/post/photo.txt", "photo")
+        with mock.patch("sys.argv", ["main.py"]), mock.patch("main.update_site_index", wraps=main.update_site_index) as update:
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.main()
+        self.assertEqual(1, update.call_count)
+        self.assertTrue(os.path.exists(main.site_index_path))
+        self.assertEqual("photo", self.read("docs/blog/post/photo.txt"))
+        self.assertTrue(os.path.exists("docs/blog/post/index.html"))
+
+    def test_staged_build_matches_sequential_build(self):
+        args = ["--fingerprint", "--search", "--feeds", "--gzip", "--gzip-min-size", "1"]
+        self.build(*args)
+        shutil.copytree("docs", "concurrent")
+        # One worker thread runs the stages one after the other.
+        with mock.patch("main.run_stages", lambda stages: run_stages(stages, max_workers=1)):
+            self.build(*args)
+        files = [rel_path for rel_path, _ in scan_files("docs")]
+        self.assertEqual(files, [rel_path for rel_path, _ in scan_files("concurrent")])
+        self.assertIn("feed.xml", files)
+        self.assertIn("search/pages.json", files)
+        self.assertIn("index.html.gz", files)
+        self.assertNotIn('href="/index.css"', self.read("docs/index.html"))
+        for rel_path in files:
+            self.assertTrue(filecmp.cmp(os.path.join("docs", rel_path), os.path.join("concurrent", rel_path), shallow=False), rel_path)
+
+
+class TestShardedBuild(SiteTestCase):
+    ARGS = ["--fingerprint", "--search", "--feeds", "--gzip", "--gzip-min-size", "1"]
+
+    def build_shards(self, count):
+        for index in range(count):
+            options = main.parse_args(self.ARGS + ["--shard", f"{index}/{count}"])
+            with contextlib.redirect_stdout(io.StringIO()):
+                main.build_shard("/", options)
+
+    def merge(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return main.merge_shards("/", main.parse_args(self.ARGS))
+
+    def test_merge_matches_full_build(self):
+        self.build(*self.ARGS)
+        shutil.copytree("docs", "full")
+        full_manifest = load_manifest(main.manifest_path)
+        self.build_shards(3)
+        pages = self.merge()
+        self.assertEqual(3, len(pages))
+        files = [rel_path for rel_path, _ in scan_files("docs")]
+        self.assertEqual([rel_path for rel_path, _ in scan_files("full")], files)
+        for rel_path in files:
+            self.assertTrue(filecmp.cmp(os.path.join("docs", rel_path), os.path.join("full", rel_path), shallow=False), rel_path)
+        self.assertEqual(full_manifest["pages"], load_manifest(main.manifest_path)["pages"])
+
+    def test_incremental_build_leaves_shard_outputs_alone(self):
+        self.build_shards(2)
+        self.merge()
+        shutil.copytree(main.dir_path_shards, "shards")
+        self.write("content/index.md", "# Home\n\nEdited.")
+        self.write("content/blog/post/index.md", "# Post\n\nEdited.")
+        self.build("--incremental", *self.ARGS)
+        self.assertIn("Rendered 2 page(s)", self.output.getvalue())
+        files = [rel_path for rel_path, _ in scan_files("shards")]
+        for rel_path in files:
+            self.assertTrue(filecmp.cmp(os.path.join("shards", rel_path), os.path.join(main.dir_path_shards, rel_path), shallow=False), rel_path)
+
+    def test_merge_reports_overlaps(self):
+        self.build_shards(2)
+        self.write(os.path.join(main.dir_path_shards, "1", "site", "index.css"), "other")
+        with self.assertRaisesRegex(ValueError, "index.css: produced by shards 0 and 1"):
+            self.merge()
+        self.assertFalse(os.path.exists("docs"))
+
+
+class TestIncrementalBuild(SiteTestCase):
+    def test_toggling_optimize_images_replaces_unchanged_images(self):
+        with open("static/images/b.png", "wb") as f:
+            f.write(make_png())
+        with open("static/images/b.png", "rb") as f:
+            source = f.read()
+        self.build()
+        self.build("--incremental", "--optimize-images")
+        with open("docs/images/b.png", "rb") as f:
+            self.assertLess(len(f.read()), len(source))
+        self.assertEqual(["images/a.png", "images/b.png"], load_manifest(main.manifest_path)["optimized_images"])
+        self.build("--incremental")
+        with open("docs/images/b.png", "rb") as f:
+            self.assertEqual(source, f.read())
+
+    def test_dropping_search_and_feeds_removes_their_files(self):
+        self.build("--search", "--feeds")
+        self.assertTrue(os.path.exists("docs/search/pages.json"))
+        self.write("static/sitemap.xml", "<urlset/>")
+        self.build("--incremental", "--search", "--feeds")
+        self.assertNotEqual("<urlset/>", self.read("docs/sitemap.xml"))
+        self.build("--incremental")
+        self.assertFalse(os.path.exists("docs/search"))
+        self.assertFalse(os.path.exists("docs/feed.xml"))
+        # A static file of the same name takes the generated one's place.
+        self.assertEqual("<urlset/>", self.read("docs/sitemap.xml"))
+        self.assertEqual([], load_manifest(main.manifest_path)["site_outputs"])
+        self.build("--incremental")
+        self.assertNotIn("left by", self.output.getvalue())
+
+    def test_dropping_search_keeps_pages_under_search(self):
+        self.write("content/search/index.md", "# Search")
+        self.build("--incremental", "--search")
+        self.build("--incremental")
+        self.assertEqual(["index.html"], os.listdir("docs/search"))
+
+
+class TestRebuildChanged(SiteTestCase):
+    # Published files are overwritten with a marker first, so whatever
+    # rebuild_changed writes again shows up as no longer holding it.
+    PAGES = ["docs/index.html", "docs/blog/post/index.html", "docs/contact/index.html"]
+
+    def setUp(self):
+        super().setUp()
+        self.manifest = self.build("--incremental")
+
+    def mark(self, *paths):
+        for path in paths:
+            self.write(path, "marker")
+
+    def marked(self):
+        paths = self.PAGES + ["docs/index.css", "docs/images/a.png"]
+        marked = []
+        for path in paths:
+            with open(path, "rb") as f:
+                if f.read() == b"marker":
+                    marked.append(path)
+        return marked
+
+    def rebuild(self, *changed):
+        options = main.parse_args(["--incremental"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.rebuild_changed(set(changed), "/", options, self.manifest)
+
+    def test_markdown_edit_renders_one_page(self):
+        self.write("content/blog/post/index.md", "# Post\n\nEdited.")
+        self.mark(*self.PAGES)
+        self.rebuild("./content/blog/post/index.md")
+        self.assertEqual(["docs/index.html", "docs/contact/index.html"], self.marked())
+        self.assertIn("Edited.", self.read("docs/blog/post/index.html"))
+
+    def test_template_edit_renders_pages_but_not_static(self):
+        self.write("template.html", "<main>{{ Content }}</main>")
+        self.mark("docs/index.css", "docs/images/a.png")
+        self.rebuild("./template.html")
+        self.assertEqual(["docs/index.css", "docs/images/a.png"], self.marked())
+        for path in self.PAGES:
+            self.assertTrue(self.read(path).startswith("<main>"), path)
+
+    def test_static_edit_syncs_one_file(self):
+        self.write("static/index.css", "p { color: red }")
+        self.mark(*self.PAGES, "docs/images/a.png")
+        self.rebuild("./static/index.css")
+        self.assertEqual(self.PAGES + ["docs/images/a.png"], self.marked())
+        self.assertEqual("p { color: red }", self.read("docs/index.css"))
+
+    def test_directory_events_rescan(self):
+        os.remove("content/contact/index.md")
+        os.rmdir("content/contact")
+        self.write("content/new/index.md", "# New")
+        self.rebuild("./content/contact", "./content/new")
+        self.assertFalse(os.path.exists("docs/contact/index.html"))
+        self.assertIn("<h1>New</h1>", self.read("docs/new/index.html"))
+
+    def test_per_page_template_edit(self):
+        self.write("blog.html", "<article>{{ Content }}</article>")
+        self.write("content/blog/post/index.md", "---\ntemplate: blog.html\n---\n# Post")
+        self.rebuild("./content/blog/post/index.md")
+        self.write("blog.html", "<section>{{ Content }}</section>")
+        self.rebuild("./blog.html")
+        self.assertTrue(self.read("docs/blog/post/index.html").startswith("<section>"))
+        self.assertTrue(self.read("docs/index.html").startswith("<html>"))
+
+
+class TestProfilePage(SiteTestCase):
+    def test_profile_page_leaves_published_page_alone(self):
+        self.build("--minify", "--fingerprint")
+        page = self.read("docs/blog/post/index.html")
+        options = main.parse_args([
+            "--minify", "--fingerprint", "--profile", "report.json", "--profile-page", "content/blog/post/index.md",
+        ])
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.write_profile("/", options, [])
+        self.assertEqual(page, self.read("docs/blog/post/index.html"))
+        self.assertTrue(os.path.exists("report.json"))
+
+    def test_profile_page_checked_with_arguments(self):
+        for args in (
+            ["--profile-page", "content/blog/post/index.md"],
+            ["--profile", "report.json", "--profile-page", "content/missing.md"],
+        ):
+            with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+                main.parse_args(args)
+        options = main.parse_args(["--profile", "report.json", "--profile-page", "./content/blog/post/index.md"])
+        self.assertEqual("./content/blog/post/index.md", options.profile_page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,10 @@ from markdown_blocks import (
     markdown_to_blocks, 
     block_to_block_type,
     markdown_to_html_node, 
+    scan_blocks,
+    block_links,
+    markdown_to_document,
+    Block,
     BlockType
 
 )
@@ -16,6 +20,7 @@ from inline_markdown import (
 )
 
 from textnode import TextNode, TextType
+from blockcache import BlockCache
 
 
 class TestInlineMarkdown(unittest.TestCase):
@@ -251,6 +256,61 @@ class TestInlineMarkdown(unittest.TestCase):
             text_to_textnodes(text),
         )
     
+    def test_delimiters_inside_link_url(self):
+        text = "see [my_page](https://example.com/my_page) now"
+        self.assertEqual(
+            [
+                TextNode("see ", TextType.TEXT),
+                TextNode("my_page", TextType.LINK, "https://example.com/my_page"),
+                TextNode(" now", TextType.TEXT),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_code_span_is_literal(self):
+        text = "run `a **b** _c_` and **d**"
+        self.assertEqual(
+            [
+                TextNode("run ", TextType.TEXT),
+                TextNode("a **b** _c_", TextType.CODE),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("d", TextType.BOLD),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_image_next_to_link(self):
+        text = "![a](x.png)[b](/y)"
+        self.assertEqual(
+            [
+                TextNode("a", TextType.IMAGE, "x.png"),
+                TextNode("b", TextType.LINK, "/y"),
+            ],
+            text_to_textnodes(text),
+        )
+
+    def test_link_text_is_literal(self):
+        # Delimiters inside link text stay part of the text; the old
+        # pipeline split on the ** first and left the link unparsed.
+        self.assertEqual(
+            [TextNode("**b**", TextType.LINK, "/u")],
+            text_to_textnodes("[**b**](/u)"),
+        )
+        self.assertEqual(
+            [
+                TextNode("a ", TextType.TEXT),
+                TextNode("_b_ and `c`", TextType.LINK, "/u"),
+            ],
+            text_to_textnodes("a [_b_ and `c`](/u)"),
+        )
+
+    def test_link_syntax_does_not_close_code_span(self):
+        # The old pipeline closed the second code span inside "![`)" and
+        # accepted this; now the link is matched first and the code span
+        # after it is left unclosed.
+        with self.assertRaises(ValueError):
+            text_to_textnodes("`a`[ ](![`)`[ ")
+
     def test_markdown_to_blocks(self):
         md = """
 This is **bolded** paragraph
@@ -479,5 +539,109 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+class TestScanBlocks(unittest.TestCase):
+    def test_typed_blocks_with_lines(self):
+        md = """# Title
+
+- a
+- b
+
+> quoted
+> text
+"""
+        blocks = list(scan_blocks(md.split("\n")))
+        self.assertEqual(
+            [
+                Block(BlockType.HEADING, ["# Title"], 1),
+                Block(BlockType.UNORDERED_LIST, ["- a", "- b"], 3),
+                Block(BlockType.QUOTE, ["> quoted", "> text"], 6),
+            ],
+            blocks,
+        )
+
+    def test_scan_file_lines(self):
+        lines = ["para one\n", "\n", "para two\n"]
+        blocks = list(scan_blocks(lines))
+        self.assertEqual(
+            [
+                Block(BlockType.PARAGRAPH, ["para one"], 1),
+                Block(BlockType.PARAGRAPH, ["para two"], 3),
+            ],
+            blocks,
+        )
+
+    def test_fenced_code_with_blank_lines(self):
+        md = """
+```
+first
+
+second
+```
+
+after
+"""
+        node = markdown_to_html_node(md)
+        self.assertEqual(
+            "<div><pre><code>first\n\nsecond\n</code></pre><p>after</p></div>",
+            node.to_html(),
+        )
+
+    def test_unclosed_fence_is_paragraph(self):
+        md = "```\nnot code\n\nstill text"
+        blocks = list(scan_blocks(md.split("\n")))
+        self.assertEqual(
+            [
+                Block(BlockType.PARAGRAPH, ["```", "not code"], 1),
+                Block(BlockType.PARAGRAPH, ["still text"], 4),
+            ],
+            blocks,
+        )
+
+    def test_long_ordered_list(self):
+        md = "\n".join(f"{i}. item {i}" for i in range(1, 12))
+        html = markdown_to_html_node(md).to_html()
+        self.assertIn("<li>item 10</li><li>item 11</li>", html)
+
+
+class TestBlockLinks(unittest.TestCase):
+    def test_links_with_lines(self):
+        md = """# [Title](/home)
+
+Intro with ![img](/images/a.png) and
+a [link](/blog/tom) plus `[code](/not/a/link)`
+
+```
+[fenced](/not/a/link)
+```
+"""
+        links = []
+        for block in scan_blocks(md.split("\n")):
+            links.extend(block_links(block))
+        self.assertEqual(
+            [(1, "/home"), (3, "/images/a.png"), (4, "/blog/tom")],
+            links,
+        )
+
+
+class TestBlockTexts(unittest.TestCase):
+    def test_texts_from_text_nodes(self):
+        md = "# The **One** Ring\n\n- [Tom](/tom)\n\n```\ncode\n```"
+        texts = []
+        markdown_to_document(md, None, None, texts)
+        self.assertEqual(["The ", "One", " Ring", "Tom"], texts)
+
+    def test_texts_from_cache(self):
+        md = "# Title\n\nsome _text_"
+        cache = BlockCache()
+        markdown_to_document(md, cache)
+        texts = []
+        markdown_to_document(md, cache, None, texts)
+        self.assertEqual(["Title", "some ", "text"], texts)
+        texts = []
+        markdown_to_document(md, cache, None, texts)
+        self.assertEqual(["Title", "some ", "text"], texts)
+        self.assertEqual(4, len(cache))
+
+
 if __name__ == "__main__":
     unittest.main()
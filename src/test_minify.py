@@ -0,0 +1,88 @@
+import io
+import random
+import unittest
+
+from minify import HtmlMinifier, minify_html
+
+PAGE = """<!doctype html>
+<html>
+  <head>
+    <title>  The   Hobbit </title>
+    <style>
+      body  { margin: 0 }
+    </style>
+  </head>
+  <body class="a  b">
+    <p>There   and
+       back again</p>
+    <PRE>line one
+    line  two</PRE>   <code>a  b</code>
+    <textarea>  keep  </textarea>
+    <script>if (a < b)  { go(); }</script>
+    <p title='x > y'>a  <br/>  b</p>
+  </body>
+</html>
+"""
+EXPECTED = """<!doctype html>
+<html>
+<head>
+<title> The Hobbit </title>
+<style>
+      body  { margin: 0 }
+    </style>
+</head>
+<body class="a  b">
+<p>There and
+back again</p>
+<PRE>line one
+    line  two</PRE> <code>a  b</code>
+<textarea>  keep  </textarea>
+<script>if (a < b)  { go(); }</script>
+<p title='x > y'>a <br/> b</p>
+</body>
+</html>
+"""
+
+
+class TestMinify(unittest.TestCase):
+    def test_minify_html(self):
+        self.assertEqual(EXPECTED, minify_html(PAGE))
+
+    def test_fragments_match_whole(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            cuts = sorted(rng.sample(range(1, len(PAGE)), rng.randrange(1, 40)))
+            out = io.StringIO()
+            minifier = HtmlMinifier(out)
+            for start, end in zip([0] + cuts, cuts + [len(PAGE)]):
+                minifier.write(PAGE[start:end])
+            minifier.finish()
+            self.assertEqual(EXPECTED, out.getvalue(), cuts)
+
+    def test_keeps_non_breaking_space(self):
+        self.assertEqual("<p>a\xa0\xa0b c</p>", minify_html("<p>a\xa0\xa0b   c</p>"))
+
+    def test_bare_less_than_is_text(self):
+        html = "<p>if a < b it's  odd</p><pre><code>it's\nif x > 1:\n    y  =  2\n</code></pre><p>a<b  c</p>"
+        expected = "<p>if a < b it's odd</p><pre><code>it's\nif x > 1:\n    y  =  2\n</code></pre><p>a<b c</p>"
+        self.assertEqual(expected, minify_html(html))
+        self.assertEqual("<a href=\"/\">< Back Home</a>", minify_html("<a href=\"/\">< Back   Home</a>"))
+
+    def test_bare_less_than_in_fragments(self):
+        fragments = ["<p>a < b it's"] + ["  x  </p><p>y's   <z</p>"] * 2000
+        out = io.StringIO()
+        minifier = HtmlMinifier(out)
+        for fragment in fragments:
+            minifier.write(fragment)
+            # Nothing past the bare "<" is held back.
+            self.assertLess(len(minifier.tail), 10)
+        minifier.finish()
+        self.assertEqual(minify_html("".join(fragments)), out.getvalue())
+
+    def test_unclosed_raw_and_tag_flushed(self):
+        self.assertEqual("<pre>  a", minify_html("<pre>  a"))
+        self.assertEqual("a <b", minify_html("a   <b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from profiling import PAGE_STAGES, build_report, profile_call, summarize
+
+
+def page_stats(source, total):
+    timings = {stage: total / len(PAGE_STAGES) for stage in PAGE_STAGES}
+    return {
+        "source": source,
+        "dest": source + ".html",
+        "timings": timings,
+        "total": total,
+        "source_bytes": 10,
+        "html_bytes": 20,
+        "output_bytes": 30,
+        "blocks": 1,
+        "nodes": 3,
+    }
+
+
+class TestProfiling(unittest.TestCase):
+    def test_report_totals(self):
+        report = build_report([page_stats("a", 0.006), page_stats("b", 0.012)])
+        self.assertEqual(2, report["totals"]["pages"])
+        self.assertAlmostEqual(0.018, report["totals"]["seconds"])
+        self.assertAlmostEqual(0.003, report["totals"]["stages"]["read"])
+        self.assertEqual(6, report["totals"]["nodes"])
+
+    def test_summary_lists_slowest_first(self):
+        report = build_report([page_stats("fast", 0.001), page_stats("slow", 0.5)])
+        summary = summarize(report, top=1)
+        self.assertIn("slow", summary)
+        self.assertNotIn("fast", summary.split("Slowest")[1])
+
+    def test_profile_call(self):
+        result = profile_call(lambda n: [str(i) for i in range(n)], 1000)
+        self.assertIn("function calls", result["cprofile"])
+        self.assertGreater(result["tracemalloc_peak_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
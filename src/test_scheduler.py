@@ -0,0 +1,68 @@
+import threading
+import unittest
+
+from scheduler import Stage, run_stages, stage_order
+
+
+class TestScheduler(unittest.TestCase):
+    def test_results_follow_dependencies(self):
+        stages = [
+            Stage("sum", lambda results: results["a"] + results["b"], ["a", "b"]),
+            Stage("a", lambda results: 1),
+            Stage("b", lambda results: 2),
+        ]
+        timings = {}
+        results = run_stages(stages, timings=timings)
+        self.assertEqual({"a": 1, "b": 2, "sum": 3}, results)
+        self.assertEqual({"a", "b", "sum"}, set(timings))
+
+    def test_independent_stages_overlap(self):
+        # Each stage waits for the other; run one after the other they would
+        # both time out.
+        barrier = threading.Barrier(2, timeout=5)
+        stages = [
+            Stage("static", lambda results: barrier.wait()),
+            Stage("pages", lambda results: barrier.wait()),
+        ]
+        self.assertEqual({"static", "pages"}, set(run_stages(stages)))
+
+    def test_dependent_waits(self):
+        events = []
+        stages = [
+            Stage("publish", lambda results: events.append("publish"), ["pages", "static"]),
+            Stage("static", lambda results: events.append("static")),
+            Stage("pages", lambda results: events.append("pages")),
+        ]
+        run_stages(stages)
+        self.assertEqual("publish", events[-1])
+
+    def test_failure_stops_dependents(self):
+        ran = []
+
+        def fail(results):
+            raise ValueError("broken page")
+
+        stages = [
+            Stage("pages", fail),
+            Stage("static", lambda results: ran.append("static")),
+            Stage("compress", lambda results: ran.append("compress"), ["pages", "static"]),
+        ]
+        with self.assertRaisesRegex(ValueError, "broken page"):
+            run_stages(stages)
+        self.assertNotIn("compress", ran)
+
+    def test_stage_order(self):
+        stages = [Stage("c", None, ["b"]), Stage("b", None, ["a"]), Stage("a", None)]
+        self.assertEqual(["a", "b", "c"], [stage.name for stage in stage_order(stages)])
+
+    def test_invalid_graphs(self):
+        with self.assertRaisesRegex(ValueError, "unknown stage"):
+            stage_order([Stage("a", None, ["missing"])])
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            stage_order([Stage("a", None, ["b"]), Stage("b", None, ["a"])])
+        with self.assertRaisesRegex(ValueError, "duplicate"):
+            stage_order([Stage("a", None), Stage("a", None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+import unittest
+
+from searchindex import build_search_index, page_terms, shard_name, tokenize, write_search_index
+
+
+class TestTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(["tom", "bombadil", "was", "mistake"], tokenize("Tom Bombadil was a mistake!"))
+
+    def test_page_terms(self):
+        self.assertEqual(["one", "ring", "the"], page_terms(["The One", "ring the"]))
+
+    def test_shard_name(self):
+        self.assertEqual("ri", shard_name("ring"))
+        self.assertEqual("42", shard_name("42"))
+        self.assertEqual("_", shard_name("éowyn"))
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "search")
+        self.pages = [
+            ("/blog/tom/", "Tom", ["bombadil", "tom"]),
+            ("/", "Home", ["tolkien", "tom"]),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.dir, name)) as f:
+            return json.load(f)
+
+    def test_build_search_index(self):
+        page_list, shards = build_search_index(self.pages)
+        self.assertEqual([["/", "Home"], ["/blog/tom/", "Tom"]], page_list)
+        self.assertEqual({"bo": {"bombadil": [1]}, "to": {"tolkien": [0], "tom": [0, 1]}}, shards)
+
+    def test_write_search_index(self):
+        written, removed = write_search_index(self.dir, self.pages)
+        self.assertEqual(["bo.json", "pages.json", "to.json"], written)
+        self.assertEqual([], removed)
+        self.assertEqual({"tolkien": [0], "tom": [0, 1]}, self.read("to.json"))
+        self.assertEqual({"pages": [["/", "Home"], ["/blog/tom/", "Tom"]]}, self.read("pages.json"))
+
+    def test_unchanged_files_not_rewritten(self):
+        write_search_index(self.dir, self.pages)
+        written, removed = write_search_index(self.dir, [self.pages[0], ("/", "Home", ["tolkien", "tom"])])
+        self.assertEqual(([], []), (written, removed))
+        written, removed = write_search_index(self.dir, [("/", "Home", ["tolkien"])])
+        self.assertEqual(["pages.json", "to.json"], written)
+        self.assertEqual(["bo.json"], removed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from serve import SiteRenderer, make_server
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+
+class SiteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.static = os.path.join(self.tmp.name, "static")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write(self.template, TEMPLATE)
+        write(os.path.join(self.content, "index.md"), "# Home\n\n[Tom](/blog/tom)")
+        write(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom\n\nHey dol!")
+        write(os.path.join(self.content, "about.md"), "# About")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        self.site = SiteRenderer(self.content, self.template, max_pages=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestSiteRenderer(SiteTestCase):
+    def test_find_source(self):
+        self.assertEqual(self.site.find_source("/"), os.path.join(self.content, "index.md"))
+        self.assertEqual(self.site.find_source("/blog/tom/"), os.path.join(self.content, "blog", "tom", "index.md"))
+        self.assertEqual(self.site.find_source("/about.html"), os.path.join(self.content, "about.md"))
+        self.assertIsNone(self.site.find_source("/blog/tom"))
+        self.assertIsNone(self.site.find_source("/index.css"))
+        self.assertIsNone(self.site.find_source("/missing/"))
+        self.assertIsNone(self.site.find_source("/../content/"))
+
+    def test_render(self):
+        html = self.site.render(self.site.find_source("/"))
+        self.assertEqual(html, b'<title>Home</title><main><div><h1>Home</h1><p><a href="/blog/tom">Tom</a></p></div></main>')
+
+    def test_cache_invalidated_by_mtime(self):
+        path = self.site.find_source("/about.html")
+        self.site.render(path)
+        self.site.render(path)
+        self.assertEqual((self.site.hits, self.site.misses), (1, 1))
+        write(path, "# About us")
+        bump_mtime(path)
+        self.assertIn(b"<h1>About us</h1>", self.site.render(path))
+        write(self.template, "<h2>{{ Title }}</h2>{{ Content }}")
+        bump_mtime(self.template)
+        self.assertTrue(self.site.render(path).startswith(b"<h2>About us</h2>"))
+        self.assertEqual(self.site.misses, 3)
+
+    def test_lru_eviction(self):
+        for url in ("/", "/about.html", "/", "/blog/tom/"):
+            self.site.render(self.site.find_source(url))
+        self.assertEqual(
+            list(self.site.pages),
+            [os.path.join(self.content, "index.md"), os.path.join(self.content, "blog", "tom", "index.md")],
+        )
+
+
+class TestServer(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = make_server(self.site, self.static, port=0)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def test_page_and_static(self):
+        with urllib.request.urlopen(self.base + "/blog/tom") as response:
+            self.assertEqual(response.url, self.base + "/blog/tom/")
+            self.assertIn(b"<p>Hey dol!</p>", response.read())
+        with urllib.request.urlopen(self.base + "/index.css") as response:
+            self.assertEqual(response.read(), b"body {}")
+
+    def test_not_found(self):
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(self.base + "/missing.html")
+        self.assertEqual(cm.exception.code, 404)
+
+    def test_render_error(self):
+        write(os.path.join(self.content, "untitled.md"), "no title here")
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(self.base + "/untitled.html")
+        self.assertEqual(cm.exception.code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
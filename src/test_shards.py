@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+
+from manifest import save_manifest
+from shards import (
+    SHARD_MANIFEST,
+    load_shards,
+    merge_manifests,
+    merge_outputs,
+    page_shard,
+    parse_shard,
+    shard_manifest,
+    shard_pages,
+)
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text)
+
+    def write_shard(self, name, index, count, pages=None, settings=None):
+        manifest = shard_manifest(index, count, settings or {"basepath": "/"})
+        manifest["pages"] = pages or {}
+        save_manifest(os.path.join(self.tmp.name, name, SHARD_MANIFEST), manifest)
+        return manifest
+
+    def test_parse_shard(self):
+        self.assertEqual((2, 4), parse_shard("2/4"))
+        for text in ("4/4", "-1/2", "1/0", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(text)
+
+    def test_shards_partition_pages(self):
+        pages = [(f"content/p{i}/index.md", f"docs/p{i}/index.html") for i in range(50)]
+        parts = [shard_pages(pages, "content", index, 3) for index in range(3)]
+        self.assertEqual(sorted(pages), sorted(page for part in parts for page in part))
+        self.assertTrue(all(parts))
+        # Stable between runs and machines: the hash is of the relative path.
+        self.assertEqual(page_shard("blog/tom/index.md", 7), page_shard(os.path.join("blog", "tom", "index.md"), 7))
+
+    def test_merge_outputs_detects_conflicts(self):
+        a = os.path.join(self.tmp.name, "a")
+        b = os.path.join(self.tmp.name, "b")
+        dest = os.path.join(self.tmp.name, "dest")
+        self.write(os.path.join(a, "index.html"), "home")
+        self.write(os.path.join(a, "same.txt"), "same")
+        self.write(os.path.join(b, "blog", "index.html"), "blog")
+        self.write(os.path.join(b, "same.txt"), "same")
+        self.assertEqual([], merge_outputs([(0, a), (1, b)], dest))
+        with open(os.path.join(dest, "blog", "index.html")) as f:
+            self.assertEqual("blog", f.read())
+        self.assertNotEqual(
+            os.stat(os.path.join(b, "blog", "index.html")).st_ino,
+            os.stat(os.path.join(dest, "blog", "index.html")).st_ino,
+        )
+
+        self.write(os.path.join(b, "index.html"), "other home")
+        self.assertEqual([("index.html", 0, 1)], merge_outputs([(0, a), (1, b)], os.path.join(self.tmp.name, "dest2")))
+
+    def test_merge_manifests(self):
+        first = self.write_shard("0", 0, 2, {"docs/index.html": {"source": "a"}})
+        first["static"] = {"index.css": {"size": 1}}
+        second = self.write_shard("1", 1, 2, {"docs/blog/index.html": {"source": "b"}})
+        merged, conflicts = merge_manifests([first, second])
+        self.assertEqual([], conflicts)
+        self.assertEqual(["docs/blog/index.html", "docs/index.html"], sorted(merged["pages"]))
+        self.assertEqual({"index.css": {"size": 1}}, merged["static"])
+        self.assertNotIn("shard", merged)
+
+        second["pages"]["docs/index.html"] = {"source": "a"}
+        _, conflicts = merge_manifests([first, second])
+        self.assertEqual([("docs/index.html", 0, 1)], conflicts)
+
+    def test_load_shards(self):
+        self.write_shard("1", 1, 2)
+        self.write_shard("0", 0, 2)
+        shards = load_shards(self.tmp.name)
+        self.assertEqual([0, 1], [manifest["shard"][0] for _, manifest in shards])
+
+    def test_load_shards_rejects_mismatches(self):
+        with self.assertRaises(ValueError):
+            load_shards(self.tmp.name)
+        self.write_shard("0", 0, 3)
+        self.write_shard("1", 1, 3)
+        with self.assertRaisesRegex(ValueError, r"missing \[2\]"):
+            load_shards(self.tmp.name)
+        self.write_shard("2", 2, 3, settings={"basepath": "/other/"})
+        with self.assertRaisesRegex(ValueError, "built with"):
+            load_shards(self.tmp.name)
+        self.write_shard("2", 0, 2)
+        with self.assertRaisesRegex(ValueError, "expected a shard of 3"):
+            load_shards(self.tmp.name)
+        with open(os.path.join(self.tmp.name, "2", SHARD_MANIFEST), "w") as f:
+            json.dump({"version": 1, "pages": {}}, f)
+        with self.assertRaisesRegex(ValueError, "not a shard manifest"):
+            load_shards(self.tmp.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from siteindex import build_site_index, page_url, pages_by_tag, published_pages
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        os.makedirs(self.content)
+        self.pages = [
+            self.page("old.md", "---\ndate: 2023-01-01\ntags: [a]\n---\n# Old"),
+            self.page("new.md", "---\ndate: 2024-01-01\ntags: [a, b]\n---\n# New"),
+            self.page("draft.md", "---\ndraft: true\n---\n# Draft"),
+            self.page("index.md", "# Home"),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def page(self, name, text):
+        path = os.path.join(self.content, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path, os.path.join(self.public, name[:-len(".md")] + ".html")
+
+    def test_page_url(self):
+        self.assertEqual("", page_url("docs/index.html", "docs"))
+        self.assertEqual("blog/tom/", page_url("docs/blog/tom/index.html", "docs"))
+        self.assertEqual("about.html", page_url("docs/about.html", "docs"))
+
+    def test_index_entries(self):
+        index = build_site_index(self.pages, self.public)
+        by_title = {entry["title"]: entry for entry in index}
+        self.assertEqual(["Old", "New", "Draft", "Home"], [entry["title"] for entry in index])
+        self.assertEqual(["a", "b"], by_title["New"]["tags"])
+        self.assertTrue(by_title["Draft"]["draft"])
+        self.assertEqual("", by_title["Home"]["url"])
+
+    def test_published_and_tags(self):
+        index = build_site_index(self.pages, self.public)
+        self.assertEqual(["New", "Old", "Home"], [entry["title"] for entry in published_pages(index)])
+        tags = pages_by_tag(index)
+        self.assertEqual(["New", "Old"], [entry["title"] for entry in tags["a"]])
+        self.assertEqual(["New"], [entry["title"] for entry in tags["b"]])
+
+    def test_unchanged_entries_reused(self):
+        index = build_site_index(self.pages, self.public)
+        index[0]["title"] = "cached"
+        again = build_site_index(self.pages, self.public, index)
+        self.assertEqual("cached", again[0]["title"])
+        self.page("old.md", "---\ndate: 2023-01-01\n---\n# Old, edited")
+        os.utime(self.pages[0][0], ns=(0, 10**9))
+        again = build_site_index(self.pages, self.public, index)
+        self.assertEqual("Old, edited", again[0]["title"])
+
+
+if __name__ == "__main__":
+    unittest.main()
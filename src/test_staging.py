@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+import unittest
+
+from staging import reuse_unchanged, start_stage, swap_dirs, write_changes
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class TestStaging(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.live = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.live, "index.html"), "same")
+        write(os.path.join(self.live, "blog", "post.html"), "old post")
+        write(os.path.join(self.live, "gone.html"), "gone")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stage(self):
+        stage = start_stage(self.live)
+        write(os.path.join(stage, "index.html"), "same")
+        write(os.path.join(stage, "blog", "post.html"), "new post")
+        write(os.path.join(stage, "new.html"), "new")
+        return stage
+
+    def test_start_stage_clears_leftovers(self):
+        stage = start_stage(self.live)
+        write(os.path.join(stage, "leftover.html"), "x")
+        stage = start_stage(self.live)
+        self.assertEqual(stage, self.live + ".staging")
+        self.assertEqual(os.listdir(stage), [])
+
+    def test_reuse_unchanged(self):
+        stage = self.stage()
+        before = os.stat(os.path.join(self.live, "index.html"))
+        changed, deleted = reuse_unchanged(stage, self.live)
+        self.assertEqual(changed, ["blog/post.html", "new.html"])
+        self.assertEqual(deleted, ["gone.html"])
+        after = os.stat(os.path.join(stage, "index.html"))
+        self.assertEqual(after.st_ino, before.st_ino)
+        self.assertEqual(after.st_mtime_ns, before.st_mtime_ns)
+
+    def test_reuse_unchanged_already_linked(self):
+        stage = start_stage(self.live)
+        os.link(os.path.join(self.live, "index.html"), os.path.join(stage, "index.html"))
+        changed, _ = reuse_unchanged(stage, self.live)
+        self.assertEqual(changed, [])
+        self.assertEqual(os.listdir(stage), ["index.html"])
+
+    def test_reuse_unchanged_without_live_dir(self):
+        stage = start_stage(os.path.join(self.tmp.name, "fresh"))
+        write(os.path.join(stage, "index.html"), "x")
+        changed, deleted = reuse_unchanged(stage, os.path.join(self.tmp.name, "fresh"))
+        self.assertEqual(changed, ["index.html"])
+        self.assertEqual(deleted, [])
+
+    def test_swap_dirs(self):
+        stage = self.stage()
+        inode = os.stat(os.path.join(self.live, "index.html")).st_ino
+        reuse_unchanged(stage, self.live)
+        swap_dirs(stage, self.live)
+        self.assertFalse(os.path.exists(stage))
+        self.assertFalse(os.path.exists(self.live + ".old"))
+        self.assertEqual(read(os.path.join(self.live, "blog", "post.html")), "new post")
+        self.assertFalse(os.path.exists(os.path.join(self.live, "gone.html")))
+        self.assertEqual(os.stat(os.path.join(self.live, "index.html")).st_ino, inode)
+
+    def test_swap_dirs_without_live_dir(self):
+        live = os.path.join(self.tmp.name, "fresh")
+        stage = start_stage(live)
+        write(os.path.join(stage, "index.html"), "x")
+        swap_dirs(stage, live)
+        self.assertEqual(read(os.path.join(live, "index.html")), "x")
+
+    def test_write_changes(self):
+        path = os.path.join(self.tmp.name, ".build", "changes.json")
+        write_changes(path, ["a.html"], ["b.html"])
+        with open(path) as f:
+            self.assertEqual(json.load(f), {"changed": ["a.html"], "deleted": ["b.html"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from template import compile_template, rewrite_basepath
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments(self):
+        template = compile_template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(["<title>", "</title><main>", "</main>"], template.segments)
+        self.assertEqual(["Title", "Content"], template.slots)
+
+    def test_render(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(
+            "<title>Hi</title><p>body</p>",
+            template.render(Title="Hi", Content="<p>body</p>"),
+        )
+
+    def test_basepath_applied_to_template_and_values(self):
+        template = compile_template(
+            '<link href="/index.css" />{{ Content }}', basepath="/site/"
+        )
+        self.assertEqual(['<link href="/site/index.css" />', ""], template.segments)
+        self.assertEqual(
+            '<link href="/site/index.css" /><a href="/site/blog">x</a><img src="/site/a.png">',
+            template.render(Content='<a href="/blog">x</a><img src="/a.png">'),
+        )
+
+    def test_matches_sequential_replace(self):
+        text = '<title>{{ Title }}</title><a href="/">home</a>{{ Content }}'
+        content = '<img src="/x.png" alt="y"><a href="https://boot.dev">z</a>'
+        expected = text.replace("{{ Title }}", "T").replace("{{ Content }}", content)
+        expected = expected.replace('href="/', 'href="/base/').replace('src="/', 'src="/base/')
+        template = compile_template(text, basepath="/base/")
+        self.assertEqual(expected, template.render(Title="T", Content=content))
+
+    def test_write_streams_nodes(self):
+        template = compile_template("<title>{{ Title }}</title>{{ Content }}", basepath="/b/")
+        node = ParentNode("div", [LeafNode("a", "x", {"href": "/y"})])
+        stream = io.StringIO()
+        template.write(stream, Title="T", Content=node)
+        self.assertEqual(
+            template.render(Title="T", Content=node.to_html()),
+            stream.getvalue(),
+        )
+
+    def test_minify(self):
+        template = compile_template("<html>\n  <title>{{ Title }}</title>\n  {{ Content }}\n</html>", minify=True)
+        node = ParentNode("div", [LeafNode("p", "a   b"), LeafNode("pre", "x\n  y")])
+        stream = io.StringIO()
+        template.write(stream, Title=" T ", Content=node)
+        expected = "<html>\n<title> T </title>\n<div><p>a b</p><pre>x\n  y</pre></div>\n</html>"
+        self.assertEqual(expected, stream.getvalue())
+        self.assertEqual(expected, template.render(Title=" T ", Content=node.to_html()))
+
+    def test_assets_rewritten_with_basepath(self):
+        assets = {"/index.css": "/index.0123abcd.css", "/a.png": "/a.4567ef01.png"}
+        template = compile_template('<link href="/index.css" />{{ Content }}', basepath="/b/", assets=assets)
+        self.assertEqual(
+            '<link href="/b/index.0123abcd.css" /><img src="/b/a.4567ef01.png"><a href="/b/blog">x</a>',
+            template.render(Content='<img src="/a.png"><a href="/blog">x</a>'),
+        )
+        self.assertEqual('<img src="https://x/a.png">', rewrite_basepath('<img src="https://x/a.png">', "/", assets))
+
+    def test_missing_value(self):
+        template = compile_template("{{ Title }}")
+        with self.assertRaises(ValueError):
+            template.render()
+
+    def test_rewrite_root_basepath_is_noop(self):
+        html = '<a href="/blog">x</a>'
+        self.assertIs(html, rewrite_basepath(html, "/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import unittest
+
+from watch import InotifyWatcher, PollingWatcher
+
+
+class WatcherTests():
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post")
+        self.write(self.template, "{{ Content }}")
+        self.templates = os.path.join(self.tmp.name, "templates")
+        os.makedirs(os.path.join(self.templates, "nested"))
+        self.watcher = self.make([self.content], [self.template], [self.templates])
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def wait(self):
+        changed = set()
+        for _ in range(20):
+            changed.update(self.watcher.wait(0.05))
+            if changed:
+                return changed
+        return changed
+
+    def test_modified_file(self):
+        path = os.path.join(self.content, "blog", "post.md")
+        self.write(path, "# Changed")
+        self.assertIn(os.path.normpath(path), self.wait())
+
+    def test_new_file_in_new_dir(self):
+        os.makedirs(os.path.join(self.content, "new"))
+        self.wait()
+        path = os.path.join(self.content, "new", "page.md")
+        self.write(path, "# New")
+        self.assertIn(os.path.normpath(path), self.wait())
+
+    def test_deleted_file(self):
+        path = os.path.join(self.content, "blog", "post.md")
+        os.remove(path)
+        self.assertIn(os.path.normpath(path), self.wait())
+
+    def test_replaced_template(self):
+        tmp_path = self.template + ".tmp"
+        self.write(tmp_path, "<main>{{ Content }}</main>")
+        os.replace(tmp_path, self.template)
+        self.assertIn(os.path.normpath(self.template), self.wait())
+
+    def test_flat_dir_reports_only_direct_files(self):
+        self.write(os.path.join(self.templates, "nested", "skip.html"), "x")
+        self.assertEqual(set(), self.watcher.wait(0.05))
+        path = os.path.join(self.templates, "blog.html")
+        self.write(path, "{{ Content }}")
+        self.assertIn(os.path.normpath(path), self.wait())
+
+    def test_unrelated_sibling_ignored(self):
+        self.write(os.path.join(self.tmp.name, "other.txt"), "x")
+        self.assertEqual(set(), self.watcher.wait(0.05))
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def make(self, dirs, files, flat_dirs):
+        return PollingWatcher(dirs, files, interval=0.01, flat_dirs=flat_dirs)
+
+    def write(self, path, text):
+        super().write(path, text)
+        # Coarse filesystem timestamps could hide a same-size rewrite.
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def make(self, dirs, files, flat_dirs):
+        return InotifyWatcher(dirs, files, flat_dirs)
+
+
+if __name__ == "__main__":
+    unittest.main()
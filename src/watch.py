@@ -0,0 +1,188 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher():
+    # Fallback that compares size/mtime snapshots of the watched trees.
+    def __init__(self, dirs, files=(), interval=0.5, flat_dirs=()):
+        self.dirs = [os.path.normpath(d) for d in dirs]
+        self.files = [os.path.normpath(f) for f in files]
+        self.flat_dirs = [os.path.normpath(d) for d in flat_dirs]
+        self.interval = interval
+        self.snapshot = self.take_snapshot()
+
+    def take_snapshot(self):
+        snapshot = {}
+        for dir_path in self.dirs:
+            for root, _, filenames in os.walk(dir_path):
+                for filename in filenames:
+                    path = os.path.join(root, filename)
+                    self._stat_into(snapshot, path)
+        for path in self.files:
+            self._stat_into(snapshot, path)
+        for dir_path in self.flat_dirs:
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            self._stat_into(snapshot, os.path.normpath(entry.path))
+            except OSError:
+                pass
+        return snapshot
+
+    def _stat_into(self, snapshot, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+
+    def poll(self):
+        snapshot = self.take_snapshot()
+        changed = set()
+        for path, stat in snapshot.items():
+            if self.snapshot.get(path) != stat:
+                changed.add(path)
+        for path in self.snapshot:
+            if path not in snapshot:
+                changed.add(path)
+        self.snapshot = snapshot
+        return changed
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = self.poll()
+            if changed:
+                return changed
+            if deadline is None:
+                time.sleep(self.interval)
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return changed
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher():
+    # Watches every directory under dirs recursively, and the parent directory
+    # of each file in files so editors that replace the file are noticed.
+    # For flat_dirs only the files directly inside are reported.
+    def __init__(self, dirs, files=(), flat_dirs=()):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = [os.path.normpath(d) for d in dirs]
+        self.files = set(os.path.normpath(f) for f in files)
+        self.flat_dirs = set(os.path.normpath(d) for d in flat_dirs)
+        self.recursive = {}
+        for dir_path in self.dirs:
+            self.watch_tree(dir_path)
+        for path in self.files:
+            self.watch_dir(os.path.dirname(path) or ".", False)
+        for dir_path in self.flat_dirs:
+            self.watch_dir(dir_path, False)
+
+    def watch_dir(self, dir_path, recursive):
+        wd = self._add_watch(self.fd, os.fsencode(dir_path), WATCH_MASK)
+        if wd < 0:
+            return
+        if self.recursive.get(wd, (None, False))[1]:
+            recursive = True
+        self.recursive[wd] = (dir_path, recursive)
+
+    def watch_tree(self, dir_path):
+        for root, _, _ in os.walk(dir_path):
+            self.watch_dir(root, True)
+
+    def read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle_event(wd, mask, name, changed)
+
+    def _handle_event(self, wd, mask, name, changed):
+        if mask & IN_Q_OVERFLOW:
+            # Events were lost; report the roots so callers rescan them.
+            changed.update(self.dirs)
+            changed.update(self.files)
+            changed.update(self.flat_dirs)
+            return
+        if mask & IN_IGNORED:
+            self.recursive.pop(wd, None)
+            return
+        if wd not in self.recursive:
+            return
+        dir_path, recursive = self.recursive[wd]
+        path = os.path.normpath(os.path.join(dir_path, name))
+        if not recursive and path not in self.files:
+            in_flat_dir = (os.path.dirname(path) or ".") in self.flat_dirs
+            if not in_flat_dir or mask & IN_ISDIR:
+                return
+        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and recursive:
+            self.watch_tree(path)
+        changed.add(path)
+
+    def wait(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        return self.read_events()
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(dirs, files=(), interval=0.5, flat_dirs=()):
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(dirs, files, flat_dirs)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(dirs, files, interval, flat_dirs)
+
+
+def wait_for_changes(watcher, settle=0.1):
+    # Blocks until something changes, then keeps collecting until the tree has
+    # been quiet for `settle` seconds so one save triggers one rebuild.
+    changed = set(watcher.wait())
+    while True:
+        more = watcher.wait(settle)
+        if not more:
+            return changed
+        changed.update(more)